@@ -1,26 +1,101 @@
 import asyncio
+import json
 import logging
+import os
+import time
 import traceback
-from typing import Any
+import unicodedata
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
 
-from app.models.enums import SearchType, Store, TranslateKeyword
+from app.models.enums import SearchType, SimilarityEngine, Store, TranslateKeyword
 from app.models.product_data import ProductItem
+from app.models.search_request import BatchSearchRequest
 from app.search.ebay import search_ebay_items
 from app.search.rakuten import search_rakuten_items
 from app.search.yahoo import (
     search_yahoo_items_by_jan_code,
     search_yahoo_items_by_keyword,
 )
-from app.services.formatter import format
-from app.services.translator import translate
+from app.services.cache import StaleWhileRevalidateCache, TTLCache
+from app.services.circuit_breaker import get_circuit_breaker
+from app.services.code_finder import parse_jan_codes
+from app.services.fan_out import BatchCallback, fan_out
+from app.services.formatter import ProductAggregator
+from app.services.http_request import CircuitOpenError, close_clients, get_flights
+from app.services.jan_ranker import rank_jan_codes
+from app.services.jan_scheduler import JanLookupScheduler
+from app.services.lookup_cache import LookupCache
+from app.services.translator import cache as translation_cache
+from app.services.translator import LazyTranslation
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-app = FastAPI()
+
+# ストア・検索方法・翻訳方法ごとに、検索に使うキーワードを返すコルーチン関数
+KeywordMap = dict[Store, dict[SearchType, dict[TranslateKeyword, Callable[[], Awaitable[list[str]]]]]]
+# まとめて検索する間、ストアとJANコードごとの検索を共有する
+SharedLookups = dict[tuple[Store, str], asyncio.Task]
+
+# 検索結果のキャッシュ(TTL経過後もSTALE_TTLの間は古い結果を返しつつ更新する)
+response_cache: StaleWhileRevalidateCache[list[ProductItem]] = StaleWhileRevalidateCache(
+    TTLCache(
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "300")),
+        stale_ttl=float(os.getenv("RESPONSE_CACHE_STALE_TTL", "3600")),
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256")),
+        max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    )
+)
+
+# 優先度順に検索するJANコードの件数(0の場合は見つかったすべてのJANコードを検索する)
+JAN_TOP_N = int(os.getenv("JAN_TOP_N", "0"))
+# 件数に満たない場合に次の優先度のJANコードへ広げて検索する回数の上限(1の場合は広げない)
+JAN_MAX_ROUNDS = int(os.getenv("JAN_MAX_ROUNDS", "1"))
+# 件数に数える商品の、価格が取得できたストア数の下限
+JAN_MIN_STORES = int(os.getenv("JAN_MIN_STORES", "2"))
+
+# 検索全体の制限時間(ミリ秒)。経過した時点で届いている結果を返す(0の場合は制限しない)
+SEARCH_DEADLINE_MS = int(os.getenv("SEARCH_DEADLINE_MS", "0"))
+
+# バッチ検索で同時に処理するキーワードの上限
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# ストアごと・JANコードごとの検索結果のキャッシュ(異なるキーワードの検索間で共有する)
+lookup_cache = LookupCache()
+
+
+class IncompleteSearchError(Exception):
+    """
+    Raised when some keywords of a store could not be searched. The results of the other keywords are kept.
+    """
+
+    def __init__(self, store: Store, items: list[dict[str, Any]], failed: list[str]) -> None:
+        """
+        Initialize the error.
+
+        Args:
+            store (Store): Store searched.
+            items (list): Results of the keywords searched successfully.
+            failed (list): Keywords that could not be searched.
+        """
+
+        super().__init__(f"{store.value}: {len(failed)} of the keywords could not be searched: {failed}")
+        self.items = items
+        self.failed = failed
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    yield
+    # 共有しているHTTPクライアントの接続を解放する
+    await close_clients()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -32,11 +107,16 @@ app.add_middleware(
 
 @app.get("/search")
 async def search_products(
+    response: Response,
     keyword: str = Query(..., min_length=1),
     search_type: SearchType = SearchType.JAN_CODE,
     translate_keyword: TranslateKeyword = TranslateKeyword.TRANSLATE,
     search_result_limit: int = Query(30, ge=1, lt=100),
     similarity_threshold: float = Query(0.45, ge=0.0, lt=1.0),
+    similarity_engine: SimilarityEngine = SimilarityEngine.DIFFLIB,
+    jan_top_n: int = JAN_TOP_N,
+    jan_max_rounds: int = JAN_MAX_ROUNDS,
+    deadline_ms: int = SEARCH_DEADLINE_MS,
 ) -> list[ProductItem]:
     """
     Search for products on Rakuten and eBay and return information grouped by JAN code or product name.
@@ -58,9 +138,102 @@ async def search_products(
         search_result_limit (int): Number of items to be retrieved for each site. (This is not the number returned.)
         similarity_threshold (float):Similarity when translating and comparing product names retrieved from each site when search_type is 0.
             The default is 0.45.
+        similarity_engine (SimilarityEngine): How product names are compared when search_type is 0.
+
+            difflib: Compare each pair with difflib. (Default)
+
+            vector: Compare all names at once with a character n-gram similarity matrix.
+        jan_top_n (int): Number of JAN codes searched in priority order when search_type is 1.
+            0 searches all JAN codes found. (Default: JAN_TOP_N environment variable)
+        jan_max_rounds (int): Maximum number of rounds searching the next JAN codes
+            while fewer than jan_top_n products are offered by JAN_MIN_STORES stores. 1 does not widen the search.
+        deadline_ms (int): Time limit of the whole search in milliseconds. When it expires, the outstanding requests
+            are cancelled and the results received so far are returned. 0 for no limit.
+            (Default: SEARCH_DEADLINE_MS environment variable)
     Returns:
         list: Product information on each site.
         Rakuten has priority for image_url.
+        Stores whose search failed or did not finish in time are listed in the X-Incomplete-Stores header.
+    """
+
+    if not keyword.strip():
+        raise HTTPException(status_code=400, detail="keyword is required.")
+
+    option: dict[str, Any] = {
+        "search_type": search_type,
+        "translate_keyword": translate_keyword,
+        "search_result_limit": search_result_limit,
+        "similarity_threshold": similarity_threshold,
+        "similarity_engine": similarity_engine,
+        "jan_top_n": max(jan_top_n, 0),
+        "jan_max_rounds": max(jan_max_rounds, 1),
+        "deadline_ms": max(deadline_ms, 0),
+    }
+
+    # 同じ条件の検索結果はキャッシュから返す(期限切れの場合は返しつつ裏で更新する)
+    # 制限時間内に終わらなかったストアがある場合は、途中の結果をキャッシュしない
+    incomplete: set[Store] = set()
+    items = await response_cache.get_or_compute(
+        get_cache_key(keyword, option),
+        lambda: run_search(keyword, option, incomplete=incomplete),
+        lambda _: not incomplete,
+    )
+    if incomplete:
+        response.headers["X-Incomplete-Stores"] = ",".join(get_store_names(incomplete))
+    return items
+
+
+@app.get("/stats")
+async def get_stats() -> dict[str, Any]:
+    """
+    Get the counters of the caches.
+
+    Returns:
+        dict: Counters of the caches, the coalesced upstream requests and the circuit breakers.
+    """
+
+    return {
+        "response_cache": response_cache.stats(),
+        "lookup_cache": lookup_cache.stats(),
+        "translation_cache": translation_cache.stats(),
+        "upstream_requests": get_flights.stats(),
+        "jan_lookups": jan_scheduler.stats(),
+        "circuit_breakers": {
+            store.value: breaker.stats() for store in Store if (breaker := get_circuit_breaker(store)) is not None
+        },
+    }
+
+
+@app.get("/search/stream")
+async def search_products_stream(
+    keyword: str = Query(..., min_length=1),
+    search_type: SearchType = SearchType.JAN_CODE,
+    translate_keyword: TranslateKeyword = TranslateKeyword.TRANSLATE,
+    search_result_limit: int = Query(30, ge=1, lt=100),
+    similarity_threshold: float = Query(0.45, ge=0.0, lt=1.0),
+    similarity_engine: SimilarityEngine = SimilarityEngine.DIFFLIB,
+    jan_top_n: int = JAN_TOP_N,
+    jan_max_rounds: int = JAN_MAX_ROUNDS,
+    deadline_ms: int = SEARCH_DEADLINE_MS,
+) -> StreamingResponse:
+    """
+    Search for products like /search, streaming partial results as NDJSON while each store's search progresses.
+    Each line is one of the following events:
+
+        {"event": "store_completed", "store": "rakuten", "count": 12}: A store finished searching (in each round).
+
+        {"event": "items", "items": [...]}: Product information of groups added or updated since the previous event.
+
+        {"event": "store_incomplete", "store": "ebay", "reason": "error", "count": 0}: A store did not return
+        all results. The reason is "error" if its search failed, "circuit_open" if the store was skipped
+        because it keeps failing, or "deadline" (without count) if it was cancelled because deadline_ms expired.
+
+        {"event": "summary", "count": 5, "stores": {"yahoo": 3, ...}, "incomplete": ["ebay"]}:
+        Number of groups, items per store and the stores that failed or did not finish.
+    Args:
+        See /search.
+    Returns:
+        StreamingResponse: Search events in NDJSON format.
     """
 
     if not keyword.strip():
@@ -71,111 +244,634 @@ async def search_products(
         "translate_keyword": translate_keyword,
         "search_result_limit": search_result_limit,
         "similarity_threshold": similarity_threshold,
+        "similarity_engine": similarity_engine,
+        "jan_top_n": max(jan_top_n, 0),
+        "jan_max_rounds": max(jan_max_rounds, 1),
+        "deadline_ms": max(deadline_ms, 0),
+    }
+
+    async def generate() -> AsyncIterator[str]:
+        search_option = with_deadline(option)
+        aggregator = ProductAggregator(search_option)
+        counts: dict[str, int] = {}
+        incomplete: set[Store] = set()
+
+        keyword_map = await prepare_keyword_map_until_deadline(keyword, search_option)
+        if keyword_map is None:
+            incomplete.update(Store)
+        else:
+            async for event in search_stores_by_priority(keyword_map, search_option, aggregator):
+                if event["event"] in ("store_completed", "store_incomplete") and "count" in event:
+                    counts[event["store"]] = counts.get(event["store"], 0) + event["count"]
+                if event["event"] == "store_incomplete":
+                    incomplete.add(Store(event["store"]))
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+
+        summary = {
+            "event": "summary",
+            "count": len(aggregator.result()),
+            "stores": counts,
+            "incomplete": get_store_names(incomplete),
+        }
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@app.post("/search/batch")
+async def search_products_batch(request: BatchSearchRequest) -> StreamingResponse:
+    """
+    Search for many keywords or JAN codes in one call, streaming the result of each input as NDJSON when it is ready.
+    JAN code lookups are shared by all inputs, so each store is searched once per JAN code for the whole batch,
+    and all lookups go through the same per-store rate limits. Each line is one of the following events:
+
+        {"event": "result", "index": 0, "keyword": "...", "items": [...], "incomplete": []}:
+        Product information of an input and the stores that failed or did not finish within deadline_ms.
+
+        {"event": "error", "index": 1, "keyword": "...", "detail": "..."}: The search of an input failed.
+
+        {"event": "summary", "count": 2, "errors": 1, "lookups": 10}:
+        Number of inputs, failed inputs and JAN code lookups.
+    Args:
+        request (BatchSearchRequest): Keywords and the options of /search shared by all keywords.
+    Returns:
+        StreamingResponse: Search events in NDJSON format.
+    """
+
+    option: dict[str, Any] = {
+        "search_type": request.search_type,
+        "translate_keyword": request.translate_keyword,
+        "search_result_limit": request.search_result_limit,
+        "similarity_threshold": request.similarity_threshold,
+        "similarity_engine": request.similarity_engine,
+        "jan_top_n": JAN_TOP_N if request.jan_top_n is None else request.jan_top_n,
+        "jan_max_rounds": JAN_MAX_ROUNDS if request.jan_max_rounds is None else request.jan_max_rounds,
+        "deadline_ms": SEARCH_DEADLINE_MS if request.deadline_ms is None else request.deadline_ms,
     }
 
-    translated: dict[str, str] = await translate(keyword)
-    keyword_en: str = translated["en"]
-    keyword_ja: str = translated["ja"]
-    combined_keyword: str = f"{keyword_en} {keyword_ja}"
+    async def generate() -> AsyncIterator[str]:
+        shared_lookups: SharedLookups = {}
+        searches: dict[tuple[Any, ...], asyncio.Task] = {}
+        semaphore = asyncio.Semaphore(max(BATCH_CONCURRENCY, 1))
+
+        async def search(keyword: str) -> tuple[list[ProductItem], set[Store]]:
+            async with semaphore:
+                incomplete: set[Store] = set()
+                items = await response_cache.get_or_compute(
+                    get_cache_key(keyword, option),
+                    lambda: run_search(keyword, option, shared_lookups, incomplete),
+                    lambda _: not incomplete,
+                )
+                return items, incomplete
+
+        async def run(index: int, keyword: str) -> dict[str, Any]:
+            if not keyword.strip():
+                return {"event": "error", "index": index, "keyword": keyword, "detail": "keyword is required."}
+
+            # 同じキーワードが複数含まれる場合は一度だけ検索する
+            key = get_cache_key(keyword, option)
+            if key not in searches:
+                searches[key] = asyncio.create_task(search(keyword))
+            try:
+                items, incomplete = await asyncio.shield(searches[key])
+                return {
+                    "event": "result",
+                    "index": index,
+                    "keyword": keyword,
+                    "items": items,
+                    "incomplete": get_store_names(incomplete),
+                }
+            except Exception:
+                logger.error(traceback.format_exc())
+                return {
+                    "event": "error",
+                    "index": index,
+                    "keyword": keyword,
+                    "detail": "An error occurred inside the server.",
+                }
+
+        tasks = [asyncio.create_task(run(index, keyword)) for index, keyword in enumerate(request.keywords)]
+        errors = 0
+        finished = False
+        try:
+            for task in asyncio.as_completed(tasks):
+                event = await task
+                if event["event"] == "error":
+                    errors += 1
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+            finished = True
+        finally:
+            if not finished:
+                # クライアントが切断した場合は残りの検索を止める
+                for task in [*tasks, *searches.values(), *shared_lookups.values()]:
+                    task.cancel()
 
-    search_keyword: str = keyword
-    if translate_keyword == 1:
-        search_keyword = keyword_ja
-    elif translate_keyword == 2:
-        search_keyword = combined_keyword
+        summary = {"event": "summary", "count": len(tasks), "errors": errors, "lookups": len(shared_lookups)}
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
 
-    logger.info("Retrieving Yahoo products by keyword ...")
-    logger.info(f"keyword: {search_keyword}")
-    yahoo_items: list[dict[str, Any]] = await search_yahoo_items_by_keyword(search_keyword, option)
-    logger.info(f"Number of items: {len(yahoo_items)}")
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
-    jan_codes: list[str] = list(set([item["jan_code"] for item in yahoo_items if item.get("jan_code")]))
-    logger.info(f"Jan codes:{jan_codes}")
 
-    keyword_map = get_keyword_map(keyword, keyword_en, keyword_ja, combined_keyword, jan_codes)
+def get_cache_key(keyword: str, option: dict[str, Any]) -> tuple[Any, ...]:
+    """
+    Create the response cache key from the normalized keyword and the options that affect the result.
+
+    Args:
+        keyword (str): Keywords for searching products.
+        option (dict): Options for searching.
+    Returns:
+        tuple: Cache key.
+    """
+
+    normalized_keyword = " ".join(unicodedata.normalize("NFKC", keyword).lower().split())
+    return (
+        normalized_keyword,
+        option["search_type"].value,
+        option["translate_keyword"].value,
+        option["search_result_limit"],
+        option["similarity_threshold"],
+        option["similarity_engine"].value,
+        option["jan_top_n"],
+        option["jan_max_rounds"],
+    )
+
+
+async def run_search(
+    keyword: str,
+    option: dict[str, Any],
+    shared_lookups: Optional[SharedLookups] = None,
+    incomplete: Optional[set[Store]] = None,
+) -> list[ProductItem]:
+    """
+    Search all stores for the keyword and format the grouped product data.
+
+    Args:
+        keyword (str): Keywords for searching products.
+        option (dict): Options for searching.
+        shared_lookups (dict): JAN code lookups shared with other searches in the same batch.
+        incomplete (set): Receives the stores that did not finish before the deadline.
+    Returns:
+        list: Product information on each site.
+    """
+
+    option = with_deadline(option)
+    incomplete = set() if incomplete is None else incomplete
+    aggregator = ProductAggregator(option)
 
-    async def get_async_items():
-        tasks = [
-            search_items(keyword_map, option, Store.YAHOO),
-            search_items(keyword_map, option, Store.RAKUTEN),
-            search_items(keyword_map, option, Store.EBAY),
-        ]
-        yahoo_items, rakuten_items, ebay_items = await asyncio.gather(*tasks)
-        return yahoo_items, rakuten_items, ebay_items
+    keyword_map = await prepare_keyword_map_until_deadline(keyword, option)
+    if keyword_map is None:
+        incomplete.update(Store)
+        return []
 
-    yahoo_items, rakuten_items, ebay_items = await get_async_items()
+    async for event in search_stores_by_priority(keyword_map, option, aggregator, shared_lookups):
+        if event["event"] == "store_incomplete":
+            incomplete.add(Store(event["store"]))
 
     logger.info("Formatting product data ...")
-    formated_items: list[ProductItem] = await format(yahoo_items, rakuten_items, ebay_items, option)
+    formated_items: list[ProductItem] = aggregator.result()
     logger.info(f"Number of formatted items: {len(formated_items)}")
 
     return formated_items
 
 
-async def search_items(keyword_map, option, store: Store) -> list[dict[str, Any]]:
+def with_deadline(option: dict[str, Any]) -> dict[str, Any]:
+    """
+    Start the time limit of a search.
+
+    Args:
+        option (dict): Options for searching.
+    Returns:
+        dict: Copy of the options with the deadline, in time.monotonic() seconds. None if there is no limit.
+    """
+
+    deadline_ms: int = option.get("deadline_ms", 0)
+    return {**option, "deadline": time.monotonic() + deadline_ms / 1000 if deadline_ms > 0 else None}
+
+
+def get_time_left(option: dict[str, Any]) -> Optional[float]:
+    """
+    Get the time left before the deadline.
+
+    Args:
+        option (dict): Options for searching, with the deadline.
+    Returns:
+        float: Seconds left, 0 if already expired. None if there is no limit.
+    """
+
+    deadline: Optional[float] = option.get("deadline")
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def get_store_names(stores: set[Store]) -> list[str]:
+    """
+    Get the names of the stores in store order.
+
+    Args:
+        stores (set): Stores.
+    Returns:
+        list: Store names.
+    """
+
+    return [store.value for store in Store if store in stores]
+
+
+async def prepare_keyword_map_until_deadline(keyword: str, option: dict[str, Any]) -> Optional[KeywordMap]:
+    """
+    Map the keywords used by each store, giving up when the deadline expires.
+
+    Args:
+        keyword (str): Keywords for searching products.
+        option (dict): Options for searching, with the deadline.
+    Returns:
+        dict: Mapped Keywords. None if the deadline expired.
+    """
+
+    try:
+        return await asyncio.wait_for(prepare_keyword_map(keyword, option), get_time_left(option))
+    except asyncio.TimeoutError:
+        logger.warning(f"Deadline expired while retrieving Jan codes for {keyword}")
+        return None
+
+
+async def prepare_keyword_map(keyword: str, option: dict[str, Any]) -> KeywordMap:
+    """
+    Find JAN codes by Yahoo keyword search, and map the keywords used by each store.
+    If the keyword itself consists of JAN codes, they are used without the Yahoo keyword search.
+    The keyword is translated only when a store searches with the translated keyword.
+
+    Args:
+        keyword (str): Keywords for searching products.
+        option (dict): Options for searching.
+    Returns:
+        dict: Mapped Keywords.
+    """
+
+    # 翻訳はストアの検索で必要になった時点で一度だけ行う
+    translation = LazyTranslation(keyword)
+
+    jan_codes: list[str] = []
+    # キーワード検索の場合はJANコードを使わないため、Yahooでの検索を行わない
+    if option["search_type"] == SearchType.JAN_CODE:
+        # JANコードが直接入力された場合は、Yahooでの検索を行わずにそのまま使う
+        jan_codes = parse_jan_codes(keyword)
+        if jan_codes:
+            logger.info(f"Jan codes (input):{jan_codes}")
+            return get_keyword_map(keyword, translation, jan_codes)
+
+        logger.info("Retrieving Yahoo products by keyword ...")
+        logger.info(f"keyword: {keyword}")
+        yahoo_items: list[dict[str, Any]] = await search_yahoo_items_by_keyword(keyword, option)
+        logger.info(f"Number of items: {len(yahoo_items)}")
+
+        # 見つかった回数の多いJANコードから順に検索する
+        jan_codes = rank_jan_codes(yahoo_items)
+        logger.info(f"Jan codes:{jan_codes}")
+
+    return get_keyword_map(keyword, translation, jan_codes)
+
+
+async def search_stores_by_priority(
+    keyword_map: KeywordMap,
+    option: dict[str, Any],
+    aggregator: ProductAggregator,
+    shared_lookups: Optional[SharedLookups] = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Search all stores, limited to the top JAN codes in priority order when jan_top_n is set.
+    While fewer than jan_top_n products are offered by JAN_MIN_STORES stores, the next JAN codes are searched
+    in later rounds, up to jan_max_rounds.
+
+    Args:
+        keyword_map (dict): Mapped Keywords.
+        option (dict): Options for searching.
+        aggregator (ProductAggregator): Aggregator that groups the results.
+        shared_lookups (dict): JAN code lookups shared with other searches in the same batch.
+    Returns:
+        AsyncIterator: Store completion events and product information of changed groups.
+    """
+
+    top_n: int = option["jan_top_n"]
+    if option["search_type"] != SearchType.JAN_CODE or top_n <= 0:
+        async for event in search_stores(keyword_map, option, aggregator, shared_lookups=shared_lookups):
+            yield event
+        return
+
+    # JANコードはすべてのストアで共通
+    jan_codes = await keyword_map[Store.YAHOO][SearchType.JAN_CODE][option["translate_keyword"]]()
+    start = 0
+    for round_index in range(option["jan_max_rounds"]):
+        # 足りない件数分だけ次の優先度のJANコードを検索する
+        shortfall = top_n - aggregator.count_offered(JAN_MIN_STORES) if round_index > 0 else top_n
+        if shortfall <= 0 or start >= len(jan_codes) or get_time_left(option) == 0:
+            break
+
+        window = slice(start, start + shortfall)
+        logger.info(f"Searching Jan codes {window.start}-{min(window.stop, len(jan_codes))} of {len(jan_codes)}")
+        async for event in search_stores(keyword_map, option, aggregator, window, shared_lookups):
+            yield event
+        start = window.stop
+
+
+async def search_stores(
+    keyword_map: KeywordMap,
+    option: dict[str, Any],
+    aggregator: ProductAggregator,
+    window: slice = slice(None),
+    shared_lookups: Optional[SharedLookups] = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    Search all stores concurrently, grouping each keyword's results into the aggregator as soon as they arrive.
+
+    Args:
+        keyword_map (dict): Mapped Keywords.
+        option (dict): Options for searching.
+        aggregator (ProductAggregator): Aggregator that groups the results.
+        window (slice): Range of the keywords to search.
+        shared_lookups (dict): JAN code lookups shared with other searches in the same batch.
+    Returns:
+        AsyncIterator: Store completion events, product information of changed groups,
+            and events of the stores whose search failed or was cancelled when the deadline expired.
+    """
+
+    # (ストア, 検索結果の件数)。件数がNoneの場合はキーワード1件分の結果の到着を表す
+    queue: asyncio.Queue[tuple[Store, Optional[int]]] = asyncio.Queue()
+    # 検索は終わったが結果がそろっていないストアと、その理由
+    reasons: dict[Store, str] = {}
+
+    async def run(store: Store) -> None:
+        async def on_batch(seq: int, keyword: str, items: list[dict[str, Any]]) -> None:
+            # 範囲内の順番をキーワード全体での順番に戻す
+            await aggregator.add(store, items, (window.start or 0) + seq)
+            queue.put_nowait((store, None))
+
+        items: list[dict[str, Any]] = []
+        try:
+            items = await search_items(keyword_map, option, store, on_batch, window, shared_lookups)
+        except IncompleteSearchError as e:
+            logger.warning(e)
+            items = e.items
+            reasons[store] = "error"
+        except CircuitOpenError as e:
+            logger.info(f"Skipping {store.value}: {e}")
+            reasons[store] = "circuit_open"
+        except Exception:
+            # 他のストアの結果は返しつつ、このストアは結果がそろっていないものとして扱う
+            logger.error(traceback.format_exc())
+            reasons[store] = "error"
+        finally:
+            breaker = get_circuit_breaker(store)
+            if store in reasons and breaker is not None and breaker.is_open():
+                reasons[store] = "circuit_open"
+            aggregator.complete(store)
+            queue.put_nowait((store, len(items)))
+
+    stores = [Store.YAHOO, Store.RAKUTEN, Store.EBAY]
+    tasks = {store: asyncio.create_task(run(store)) for store in stores}
+    completed: set[Store] = set()
+
+    def complete(store: Store, count: int) -> dict[str, Any]:
+        completed.add(store)
+        if store in reasons:
+            return {"event": "store_incomplete", "store": store.value, "reason": reasons[store], "count": count}
+        return {"event": "store_completed", "store": store.value, "count": count}
+
+    try:
+        while len(completed) < len(stores):
+            if queue.empty():
+                try:
+                    store, count = await asyncio.wait_for(queue.get(), get_time_left(option))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                # 制限時間を過ぎるとwait_forは届いている結果も読み取らないため、先に取り出す
+                store, count = queue.get_nowait()
+            if count is not None:
+                yield complete(store, count)
+
+            changes = aggregator.drain_changes()
+            if changes:
+                yield {"event": "items", "items": changes}
+
+        if len(completed) < len(stores):
+            # 制限時間を過ぎたストアの検索を取り消し、届いている結果だけをまとめる
+            expired = {store for store in stores if not tasks[store].done()}
+            for store in expired:
+                logger.warning(f"Deadline expired while retrieving {store.value} products")
+                tasks[store].cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+            while not queue.empty():
+                store, count = queue.get_nowait()
+                # 取り消す前に終わっていたストアは完了として扱う
+                if count is not None and store not in expired:
+                    yield complete(store, count)
+
+            changes = aggregator.drain_changes()
+            if changes:
+                yield {"event": "items", "items": changes}
+            for store in stores:
+                if store not in completed:
+                    yield {"event": "store_incomplete", "store": store.value, "reason": "deadline"}
+    finally:
+        for task in tasks.values():
+            task.cancel()
+
+
+async def search_items(
+    keyword_map: KeywordMap,
+    option: dict[str, Any],
+    store: Store,
+    on_batch: Optional[BatchCallback] = None,
+    window: slice = slice(None),
+    shared_lookups: Optional[SharedLookups] = None,
+) -> list[dict[str, Any]]:
     logger.info(f"Retrieving {store.value} products ...")
-    keywords: list[str] = keyword_map[store][option["search_type"]][option["translate_keyword"]]
+    keywords: list[str] = await keyword_map[store][option["search_type"]][option["translate_keyword"]]()
+    keywords = keywords[window]
+    if option["search_type"] == SearchType.JAN_CODE:
+        items = await search_items_with_cache(keywords, option, store, on_batch, shared_lookups)
+    else:
+        items = await search_store(keywords, option, store, on_batch)
+    logger.info(f"Number of items in {store.value}: {len(items)}")
+
+    return items
+
+
+async def search_items_with_cache(
+    jan_codes: list[str],
+    option: dict[str, Any],
+    store: Store,
+    on_batch: Optional[BatchCallback] = None,
+    shared_lookups: Optional[SharedLookups] = None,
+) -> list[dict[str, Any]]:
+    """
+    Search a store by JAN codes, reusing the cached lookups and searching only the missing codes.
+    The missing codes are searched through the scheduler together with the lookups of other requests.
+    If some codes could not be searched, IncompleteSearchError is raised with the items of the other codes.
+    Args:
+        jan_codes (list): JAN codes.
+        option (dict): Search options.
+        store (Store): Store to search.
+        on_batch (Callable): Called with the results of each JAN code, in the order of jan_codes as seq.
+        shared_lookups (dict): JAN code lookups shared with other searches in the same batch.
+            Each missing code is searched once for the whole batch.
+    Returns:
+        list: Items of all JAN codes.
+    """
+
+    results: list[list[dict[str, Any]]] = [[] for _ in jan_codes]
+    missing: list[int] = []
+    for seq, jan_code in enumerate(jan_codes):
+        cached = lookup_cache.get(store, (jan_code, option["search_result_limit"]))
+        if cached is None:
+            missing.append(seq)
+            continue
+
+        results[seq] = cached
+        if on_batch is not None:
+            await on_batch(seq, jan_code, cached)
+
+    if missing:
+        logger.info(f"{store.value}: {len(jan_codes) - len(missing)} cached, {len(missing)} to search")
+
+        async def on_missing_batch(index: int, jan_code: str, items: list[dict[str, Any]]) -> None:
+            # 未取得分の順番を元の順番に戻し、取得できた結果をキャッシュする
+            seq = missing[index]
+            results[seq] = items
+            lookup_cache.set(store, (jan_code, option["search_result_limit"]), items)
+            if on_batch is not None:
+                await on_batch(seq, jan_code, items)
+
+        limit: int = option["search_result_limit"]
+        failed: list[str] = []
+
+        async def search(jan_code: str) -> Optional[list[dict[str, Any]]]:
+            if shared_lookups is None:
+                items = await jan_scheduler.lookup(store, jan_code, limit)
+            else:
+                # 同じバッチ内の他の検索で実行中・実行済みであればその結果を使う
+                task = shared_lookups.get((store, jan_code))
+                if task is None:
+                    task = asyncio.create_task(jan_scheduler.lookup(store, jan_code, limit))
+                    shared_lookups[(store, jan_code)] = task
+                items = await asyncio.shield(task)
+            if items is None:
+                failed.append(jan_code)
+            return items
+
+        # 他のリクエストの検索とまとめて実行されるため、ここでは同時実行数を制限しない
+        missing_codes = [jan_codes[seq] for seq in missing]
+        await fan_out(missing_codes, search, concurrency=len(missing_codes), on_batch=on_missing_batch)
+
+        if failed:
+            # 取得できた結果は残しつつ、検索できなかったJANコードがあることを呼び出し元に伝える
+            raise IncompleteSearchError(store, [item for items in results for item in items], failed)
+
+    return [item for items in results for item in items]
+
+
+async def search_store(
+    keywords: list[str], option: dict[str, Any], store: Store, on_batch: Optional[BatchCallback] = None
+) -> list[dict[str, Any]]:
     items: list[dict[str, Any]] = []
+    breaker = get_circuit_breaker(store)
+    if breaker is not None and breaker.is_open():
+        # 障害中のストアは検索しない(JANコード検索ではキャッシュ済みの結果だけが返る)
+        raise CircuitOpenError(f"Circuit for {store.value} is open")
+
     if store == Store.YAHOO:
-        items = await search_yahoo_items_by_jan_code(keywords, option)
+        items = await search_yahoo_items_by_jan_code(keywords, option, on_batch)
     elif store == Store.RAKUTEN:
-        items = await search_rakuten_items(keywords, option)
+        items = await search_rakuten_items(keywords, option, on_batch)
     elif store == Store.EBAY:
-        items = await search_ebay_items(keywords, option)
-    logger.info(f"Number of items in {store.value}: {len(items)}")
+        items = await search_ebay_items(keywords, option, on_batch)
 
     return items
 
 
-def get_keyword_map(
-    keyword, keyword_en, keyword_ja, combined_keyword, jan_codes
-) -> dict[Store, dict[SearchType, dict[object, Any]]]:
+async def dispatch_jan_codes(store: Store, jan_codes: list[str], limit: int, on_batch: BatchCallback) -> None:
+    """
+    Search a store by the JAN codes collected by the scheduler.
+    Args:
+        store (Store): Store to search.
+        jan_codes (list): JAN codes.
+        limit (int): Number of items to retrieve for each code.
+        on_batch (Callable): Called with the results of each JAN code.
+    """
+
+    option: dict[str, Any] = {"search_type": SearchType.JAN_CODE, "search_result_limit": limit}
+    await search_store(jan_codes, option, store, on_batch)
+
+
+# すべてのリクエストのJANコードの検索をまとめて、JANコードごとに一度だけ検索する
+jan_scheduler = JanLookupScheduler(dispatch_jan_codes)
+
+
+def get_keyword_map(keyword: str, translation: LazyTranslation, jan_codes: list[str]) -> KeywordMap:
     """
     Define keyword mappings for each platform, search type, and translation option.
+    Each mapping is a coroutine function so that only the keywords actually used are translated.
     Args:
         keyword (str): The original keyword.
-        keyword_en (str): Keywords translated into Japanese.
-        keyword_ja (str): Keywords translated into English.
-        combined_keyword (str): Japanese and English keywords.
-        jan_codes (Store): JAN codes.
+        translation (LazyTranslation): English and Japanese forms of the keyword.
+        jan_codes (list): JAN codes.
     Returns:
         dict: Mapped Keywords.
     """
-    keyword_map = {
+
+    async def original() -> list[str]:
+        return [keyword]
+
+    async def english() -> list[str]:
+        return [await translation.en()]
+
+    async def japanese() -> list[str]:
+        return [await translation.ja()]
+
+    async def combined() -> list[str]:
+        keyword_en, keyword_ja = await asyncio.gather(translation.en(), translation.ja())
+        return [f"{keyword_en} {keyword_ja}"]
+
+    async def jan() -> list[str]:
+        return jan_codes
+
+    keyword_map: KeywordMap = {
         Store.YAHOO: {
             SearchType.KEYWORD: {
-                TranslateKeyword.ORIGINAL: [keyword],
-                TranslateKeyword.TRANSLATE: [keyword_ja],
-                2: [combined_keyword],
+                TranslateKeyword.ORIGINAL: original,
+                TranslateKeyword.TRANSLATE: japanese,
+                TranslateKeyword.ORIGINAL_AND_TRANSLATE: combined,
             },
             SearchType.JAN_CODE: {
-                TranslateKeyword.ORIGINAL: jan_codes,
-                TranslateKeyword.TRANSLATE: jan_codes,
-                2: jan_codes,
+                TranslateKeyword.ORIGINAL: jan,
+                TranslateKeyword.TRANSLATE: jan,
+                TranslateKeyword.ORIGINAL_AND_TRANSLATE: jan,
             },
         },
         Store.RAKUTEN: {
             SearchType.KEYWORD: {
-                TranslateKeyword.ORIGINAL: [keyword],
-                TranslateKeyword.TRANSLATE: [keyword_ja],
-                2: [combined_keyword],
+                TranslateKeyword.ORIGINAL: original,
+                TranslateKeyword.TRANSLATE: japanese,
+                TranslateKeyword.ORIGINAL_AND_TRANSLATE: combined,
             },
             SearchType.JAN_CODE: {
-                TranslateKeyword.ORIGINAL: jan_codes,
-                TranslateKeyword.TRANSLATE: jan_codes,
-                2: jan_codes,
+                TranslateKeyword.ORIGINAL: jan,
+                TranslateKeyword.TRANSLATE: jan,
+                TranslateKeyword.ORIGINAL_AND_TRANSLATE: jan,
             },
         },
         Store.EBAY: {
             SearchType.KEYWORD: {
-                TranslateKeyword.ORIGINAL: [keyword],
-                TranslateKeyword.TRANSLATE: [keyword_en],
-                2: [combined_keyword],
+                TranslateKeyword.ORIGINAL: original,
+                TranslateKeyword.TRANSLATE: english,
+                TranslateKeyword.ORIGINAL_AND_TRANSLATE: combined,
             },
             SearchType.JAN_CODE: {
-                TranslateKeyword.ORIGINAL: jan_codes,
-                TranslateKeyword.TRANSLATE: jan_codes,
-                2: jan_codes,
+                TranslateKeyword.ORIGINAL: jan,
+                TranslateKeyword.TRANSLATE: jan,
+                TranslateKeyword.ORIGINAL_AND_TRANSLATE: jan,
             },
         },
     }
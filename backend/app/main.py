@@ -1,31 +1,56 @@
 # main.py
 
+import argparse
 import asyncio
 import logging
 import sys
+import time
+from typing import Any, Iterator, Optional, TextIO
 
-from app.api import search_products
-from app.models.enums import SearchType, TranslateKeyword
+from app.api import JAN_MAX_ROUNDS, JAN_TOP_N, SEARCH_DEADLINE_MS, get_store_names, run_search
+from app.models.enums import SearchType, SimilarityEngine, Store, TranslateKeyword
 from app.models.product_data import ProductItem
-from app.services.save import save_to_json
+from app.services.http_request import close_clients
+from app.services.save import append_to_jsonl, get_output_path, load_jsonl_values, open_jsonl, save_to_json
 from dotenv import load_dotenv
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+search_type: SearchType = SearchType.JAN_CODE
+translate_keyword: TranslateKeyword = TranslateKeyword.TRANSLATE
+search_result_limit: int = 30
+similarity_threshold: float = 0.45
+
+
+def get_option() -> dict[str, Any]:
+    """
+    Get the options for searching from the command line, with the same defaults as /search.
+
+    Returns:
+        dict: Options for searching.
+    """
+
+    return {
+        "search_type": search_type,
+        "translate_keyword": translate_keyword,
+        "search_result_limit": search_result_limit,
+        "similarity_threshold": similarity_threshold,
+        "similarity_engine": SimilarityEngine.DIFFLIB,
+        "jan_top_n": max(JAN_TOP_N, 0),
+        "jan_max_rounds": max(JAN_MAX_ROUNDS, 1),
+        "deadline_ms": max(SEARCH_DEADLINE_MS, 0),
+    }
+
 
 async def search(keyword: str) -> None:
     load_dotenv()
 
-    search_type: SearchType = SearchType.JAN_CODE
-    translate_keyword: TranslateKeyword = TranslateKeyword.TRANSLATE
-    search_result_limit: int = 30
-    similarity_threshold: float = 0.45
-
     try:
-        formated_items: list[ProductItem] = await search_products(
-            keyword, search_type, translate_keyword, search_result_limit, similarity_threshold
-        )
+        incomplete: set[Store] = set()
+        formated_items: list[ProductItem] = await run_search(keyword, get_option(), incomplete=incomplete)
+        if incomplete:
+            logger.warning(f"Results are incomplete for {', '.join(get_store_names(incomplete))}.")
         logger.info("Saving results ...")
         save_to_json(formated_items)
 
@@ -33,13 +58,123 @@ async def search(keyword: str) -> None:
 
     except Exception as e:
         logger.error(e)
+    finally:
+        await close_clients()
+
+
+async def search_bulk(keywords: Iterator[str], output: str, concurrency: int, resume: bool = True) -> None:
+    """
+    Search many keywords concurrently, appending each result to a JSONL file as soon as it completes.
+    Keywords already in the file are skipped when resuming, so an interrupted run can be continued.
+    Keywords whose search failed or did not finish on every store are not written, and are searched again on resume.
+
+    Args:
+        keywords (Iterator): Keywords to search.
+        output (str): The JSONL file name.
+        concurrency (int): Maximum number of keywords searched at the same time.
+        resume (bool): Whether to skip the keywords already in the file.
+    """
+
+    load_dotenv()
+
+    filepath = get_output_path(output)
+    done: set[str] = load_jsonl_values(filepath, "keyword") if resume else set()
+    if done:
+        logger.info(f"Resuming: {len(done)} keywords already searched.")
+
+    option = get_option()
+    searched = 0
+    failed = 0
+    unfinished = 0
+    skipped = 0
+    items_count = 0
+    started = time.monotonic()
+
+    async def worker(f: TextIO) -> None:
+        nonlocal searched, failed, unfinished, skipped, items_count
+        # キーワードは各ワーカーが順に取り出すため、すべてをメモリに読み込まない
+        for keyword in keywords:
+            if keyword in done:
+                skipped += 1
+                continue
+            done.add(keyword)
+
+            incomplete: set[Store] = set()
+            try:
+                formated_items: list[ProductItem] = await run_search(keyword, option, incomplete=incomplete)
+            except Exception as e:
+                # 失敗したキーワードは書き込まず、再開時に改めて検索する
+                failed += 1
+                logger.error(f"Search failed for {keyword}: {e}")
+                continue
+
+            if incomplete:
+                # 一部のストアの結果が欠けたキーワードも書き込まず、再開時に改めて検索する
+                unfinished += 1
+                logger.warning(f"Search incomplete for {keyword}: {', '.join(get_store_names(incomplete))}")
+                continue
+
+            append_to_jsonl({"keyword": keyword, "items": formated_items}, f)
+            searched += 1
+            items_count += len(formated_items)
+
+    with open_jsonl(filepath) as f:
+        try:
+            await asyncio.gather(*[worker(f) for _ in range(max(concurrency, 1))])
+        finally:
+            await close_clients()
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Searched {searched} keywords ({items_count} items) in {elapsed:.1f}s: "
+        f"{searched / elapsed if elapsed > 0 else 0.0:.2f} keywords/s. "
+        f"Failed: {failed}, incomplete: {unfinished}, skipped: {skipped}. Check {output}."
+    )
+
+
+def read_keywords(path: str) -> Iterator[str]:
+    """
+    Read keywords line by line from a file or stdin. Blank lines are skipped.
+
+    Args:
+        path (str): Path of the file. "-" reads from stdin.
+    Returns:
+        Iterator: Keywords.
+    """
+
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in f:
+            keyword = line.strip()
+            if keyword:
+                yield keyword
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Search products on Yahoo, Rakuten and eBay.")
+    parser.add_argument("keyword", nargs="?", help="Keyword to search. The result is saved to output.json.")
+    parser.add_argument("-i", "--input", help='File with one keyword per line for bulk search. "-" reads from stdin.')
+    parser.add_argument(
+        "-o", "--output", default="output.jsonl", help="JSONL file the bulk search results are appended to."
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=4, help="Number of keywords searched at the same time."
+    )
+    parser.add_argument(
+        "--no-resume", action="store_true", help="Search again the keywords already in the output file."
+    )
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    args = sys.argv
-    print(args)
-    if len(args) == 1:
+    args = parse_args()
+    if args.input:
+        asyncio.run(search_bulk(read_keywords(args.input), args.output, args.concurrency, not args.no_resume))
+    elif args.keyword:
+        asyncio.run(search(args.keyword))
+    else:
         logger.info("The keyword is required.")
         sys.exit(1)
-
-    asyncio.run(search(args[1]))
@@ -30,3 +30,12 @@ class Store(Enum):
     EBAY = "ebay"
     RAKUTEN = "rakuten"
     YAHOO = "yahoo"
+
+
+class SimilarityEngine(Enum):
+    """
+    An enum that defines how product names are compared when grouping by product name.
+    """
+
+    DIFFLIB = "difflib"
+    VECTOR = "vector"
@@ -1,5 +1,6 @@
 # common/product_data.py
 
+from app.models.enums import Store
 from typing_extensions import Any, Literal, Optional, TypedDict
 
 
@@ -27,24 +28,86 @@ class ImageUrlInfo(TypedDict):
     ebay: Optional[str]
 
 
-class WorkPrice(TypedDict):
-    yahoo: list[Optional[float]]
-    rakuten: list[Optional[float]]
-    ebay: list[Optional[float]]
-
-
-class TargetPrice(TypedDict):
-    yahoo: Optional[float]
-    rakuten: Optional[float]
-    ebay: Optional[float]
-
-
-class WorkProductItem(TypedDict):
-    product_name: ProductNameInfo
-    work_price: WorkPrice
-    target_price: TargetPrice
-    url: UrlInfo
-    image_url: ImageUrlInfo
+class StoreOffer:
+    """
+    Running aggregate of one store's offers in a product group.
+    Only the price range, the number of prices and the cheapest offer are kept.
+    """
+
+    __slots__ = ("min", "max", "count", "target", "rank", "product_name", "url", "image_url")
+
+    def __init__(self) -> None:
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.count: int = 0
+        self.target: Optional[float] = None
+        self.rank: tuple[int, ...] = ()
+        self.product_name: Optional[str] = None
+        self.url: Optional[str] = None
+        self.image_url: Optional[str] = None
+
+    def add(self, price: Optional[float], item: dict[str, Any], rank: tuple[int, ...] = ()) -> None:
+        """
+        Add an offer. The offer becomes the target if it is cheaper than the current one,
+        or as cheap and ranked before it.
+
+        Args:
+            price (float): Price of the offer. Ignored if None.
+            item (dict): Product data of the offer.
+            rank (tuple): Order of the offer used to break ties. Without it, the first offer added wins.
+        """
+
+        if price is None:
+            return
+
+        self.count += 1
+        if self.min is None or price < self.min:
+            self.min = price
+        if self.max is None or price > self.max:
+            self.max = price
+
+        # 最安値の場合は対象の商品として更新
+        if self.target is None or price < self.target or (price == self.target and rank < self.rank):
+            self.target = price
+            self.rank = rank
+            self.product_name = item.get("product_name")
+            self.url = item.get("url")
+            self.image_url = item.get("image_url")
+
+    def to_price_info(self) -> PriceInfo:
+        """
+        Get the price range and the target price.
+
+        Returns:
+            PriceInfo: Minimum, maximum and target prices.
+        """
+
+        return {"min": self.min, "max": self.max, "target": self.target}
+
+
+class WorkProductItem:
+    """
+    Product group being built from the offers of each store.
+    """
+
+    __slots__ = ("yahoo", "rakuten", "ebay")
+
+    def __init__(self) -> None:
+        self.yahoo: StoreOffer = StoreOffer()
+        self.rakuten: StoreOffer = StoreOffer()
+        self.ebay: StoreOffer = StoreOffer()
+
+    def offer(self, store: Store) -> StoreOffer:
+        """
+        Get the aggregate of the store.
+
+        Args:
+            store (Store): Enumerated stores.
+        Returns:
+            StoreOffer: Aggregate of the store's offers.
+        """
+
+        return getattr(self, store.value)
 
 
 class ProductItem(TypedDict):
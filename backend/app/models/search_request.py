@@ -0,0 +1,26 @@
+# common/search_request.py
+
+from typing import Optional
+
+from app.models.enums import SearchType, SimilarityEngine, TranslateKeyword
+from pydantic import BaseModel, Field
+
+# 1回のバッチ検索で受け付けるキーワードの上限
+BATCH_MAX_KEYWORDS = 1000
+
+
+class BatchSearchRequest(BaseModel):
+    """
+    Request body of the batch search. The options are shared by all keywords and mean the same as in /search.
+    """
+
+    keywords: list[str] = Field(..., min_length=1, max_length=BATCH_MAX_KEYWORDS)
+    search_type: SearchType = SearchType.JAN_CODE
+    translate_keyword: TranslateKeyword = TranslateKeyword.TRANSLATE
+    search_result_limit: int = Field(30, ge=1, lt=100)
+    similarity_threshold: float = Field(0.45, ge=0.0, lt=1.0)
+    similarity_engine: SimilarityEngine = SimilarityEngine.DIFFLIB
+    # 省略した場合はサーバーの既定値を使う
+    jan_top_n: Optional[int] = Field(None, ge=0)
+    jan_max_rounds: Optional[int] = Field(None, ge=1)
+    deadline_ms: Optional[int] = Field(None, ge=0)
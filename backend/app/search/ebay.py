@@ -3,56 +3,68 @@
 import base64
 import logging
 import os
-from typing import Any
+from typing import Any, Optional
 
 import httpx
-import requests
-from app.models.enums import SearchType
-from app.services.http_request import get_requests
+from app.models.enums import SearchType, Store
+from app.services.fan_out import BatchCallback, fan_out
+from app.services.http_request import get_requests, post_requests
+from app.services.pagination import fetch_pages
+from app.services.token_manager import TokenManager
 
 EBAY_APP_ID = os.getenv("EBAY_APP_ID")
 EBAY_CLIENT_SECRET = os.getenv("EBAY_CLIENT_SECRET")
+# 1回のリクエストで取得できる件数の上限
+EBAY_PAGE_SIZE = 200
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def search_ebay_items(keywords: list[str], option: dict[str, Any]) -> list[dict[str, Any]]:
+async def search_ebay_items(
+    keywords: list[str], option: dict[str, Any], on_batch: Optional[BatchCallback] = None
+) -> list[dict[str, Any]]:
     """
     Search eBay products.
 
     Args:
         keywords (list): Search keyword or jan codes.
         option (dict): Options for Searching.
+        on_batch (Callable): Called with the results of each keyword as soon as they arrive.
     Returns:
         list: eBay product search results.
     """
 
-    token: str = _get_access_token()
+    token: str = await _get_access_token()
     if not token:
         logger.info("eBayトークン取得失敗")
         return []
 
-    items: list[dict[str, Any]] = []
-    async with httpx.AsyncClient() as client:
-        search_url: str = "https://api.ebay.com/buy/browse/v1/item_summary/search"
-        headers: dict[str, str] = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
-        search_params: dict[str, Any] = {"limit": option["search_result_limit"]}
+    search_url: str = "https://api.ebay.com/buy/browse/v1/item_summary/search"
+    headers: dict[str, str] = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+    }
 
-        for keyword in keywords:
+    async def search(keyword: str) -> Optional[list[dict[str, Any]]]:
+        async def fetch(offset: int, size: int) -> Optional[tuple[list[dict[str, Any]], Optional[int]]]:
             try:
-                search_params["q"] = keyword
+                params: dict[str, Any] = {"limit": size, "q": keyword}
+                if offset > 0:
+                    params["offset"] = offset
 
-                data: dict[str, Any] = await get_requests(search_url, headers, search_params)
+                data: dict[str, Any] = await get_requests(search_url, headers, params, store=Store.EBAY)
 
-                items.extend(parse_item(keyword, option["search_type"], data))
-            except httpx.HTTPStatusError as e:
+                return parse_item(keyword, option["search_type"], data), data.get("total")
+            except httpx.HTTPError as e:
                 logger.warning(f"eBay request failed for {keyword}: {e}")
+                return None
 
-    return items
+        # 上限を超える件数は1ページ目の総件数を見て、存在するページだけを並行して取得する
+        return await fetch_pages(option["search_result_limit"], EBAY_PAGE_SIZE, fetch)
+
+    # キーワードごとの検索を並行して実行する
+    return await fan_out(keywords, search, on_batch=on_batch)
 
 
 def parse_item(keyword: str, search_type: SearchType, data: dict[str, Any]) -> list[dict[str, Any]]:
@@ -74,13 +86,25 @@ def parse_item(keyword: str, search_type: SearchType, data: dict[str, Any]) -> l
         return []
 
 
-def _get_access_token() -> str:
+async def _get_access_token() -> str:
     """
-    Use the EBAY_APP_ID and EBAY_CLIENT_SECRET specified in .env to generate a token for use with the eBay API.
+    Get the token for use with the eBay API.
+    The token is cached until shortly before it expires and refreshed in the background.
 
     Returns:
         Generated token.
     """
+
+    return await __token_manager.get()
+
+
+async def _request_access_token() -> tuple[str, float]:
+    """
+    Use the EBAY_APP_ID and EBAY_CLIENT_SECRET specified in .env to generate a token for use with the eBay API.
+
+    Returns:
+        tuple: Generated token and its lifetime in seconds.
+    """
     credentials: str = f"{EBAY_APP_ID}:{EBAY_CLIENT_SECRET}"
 
     encoded_credentials: str = base64.b64encode(credentials.encode()).decode()
@@ -94,10 +118,14 @@ def _get_access_token() -> str:
         "scope": "https://api.ebay.com/oauth/api_scope",
     }
 
-    response: Any = requests.post("https://api.ebay.com/identity/v1/oauth2/token", headers=headers, data=data)
+    try:
+        response: dict[str, Any] = await post_requests(
+            "https://api.ebay.com/identity/v1/oauth2/token", headers, data, store=Store.EBAY
+        )
+        return response["access_token"], float(response.get("expires_in", 7200))
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        logger.info(f"Failed to get token: {e}")
+        return "", 0.0
+
 
-    if response.status_code == 200:
-        return response.json()["access_token"]
-    else:
-        logger.info("Failed to get token:", response.text)
-        return ""
+__token_manager: TokenManager = TokenManager(_request_access_token)
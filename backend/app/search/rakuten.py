@@ -1,57 +1,68 @@
 # search/rakuten.py
 
-import asyncio
 import logging
 import os
-from typing import Any
+from typing import Any, Optional
 
 import httpx
-from app.models.enums import SearchType
+from app.models.enums import SearchType, Store
 from app.services.code_finder import find_jan_code
+from app.services.fan_out import BatchCallback, fan_out
 from app.services.http_request import get_requests
+from app.services.pagination import fetch_pages
 
 RAKUTEN_APP_ID = os.environ.get("RAKUTEN_APP_ID")
+# 1回のリクエストで取得できる件数の上限
+RAKUTEN_PAGE_SIZE = 30
 
 seen_jan_codes: set = set()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def search_rakuten_items(keywords: list[str], option: dict[str, Any]) -> list[dict[str, Any]]:
+async def search_rakuten_items(
+    keywords: list[str], option: dict[str, Any], on_batch: Optional[BatchCallback] = None
+) -> list[dict[str, Any]]:
     """
     Search Rakuten products.
 
     Args:
         keywords (list): Search keyword or jan codes.
         option (dict): Options for Searching.
+        on_batch (Callable): Called with the results of each keyword as soon as they arrive.
     Returns:
         list: Rakuten product search results.
     """
 
-    items: list[dict[str, Any]] = []
-    async with httpx.AsyncClient() as client:
-        search_url: str = "https://app.rakuten.co.jp/services/api/IchibaItem/Search/20170706"
-        search_params: dict[str, Any] = {
-            "applicationId": RAKUTEN_APP_ID,
-            "format": "json",
-            "formatVersion": 2,
-            "hits": option["search_result_limit"],
-        }
-
-        for keyword in keywords:
+    search_url: str = "https://app.rakuten.co.jp/services/api/IchibaItem/Search/20170706"
+    limit: int = option["search_result_limit"]
+    search_params: dict[str, Any] = {
+        "applicationId": RAKUTEN_APP_ID,
+        "format": "json",
+        "formatVersion": 2,
+        # 複数ページに分ける場合はページ番号で位置を指定するため、件数をページサイズに揃える
+        "hits": limit if limit <= RAKUTEN_PAGE_SIZE else RAKUTEN_PAGE_SIZE,
+    }
+
+    async def search(keyword: str) -> Optional[list[dict[str, Any]]]:
+        async def fetch(offset: int, size: int) -> Optional[tuple[list[dict[str, Any]], Optional[int]]]:
             try:
-                # 429のエラーを発生させないためにsleepを入れる(0.2だと429発生)
-                await asyncio.sleep(0.3)
+                params: dict[str, Any] = {**search_params, "keyword": keyword}
+                if offset > 0:
+                    params["page"] = offset // RAKUTEN_PAGE_SIZE + 1
 
-                search_params["keyword"] = keyword
+                data: dict[str, Any] = await get_requests(search_url, params=params, store=Store.RAKUTEN)
 
-                data: dict[str, Any] = await get_requests(search_url, params=search_params)
-
-                items.extend(parse_item(keyword, option["search_type"], data))
-            except httpx.HTTPStatusError as e:
+                return parse_item(keyword, option["search_type"], data), data.get("count")
+            except httpx.HTTPError as e:
                 logger.warning(f"Rakuten request failed for {keyword}: {e}")
+                return None
+
+        # 上限を超える件数は1ページ目の総件数を見て、存在するページだけを並行して取得する
+        return await fetch_pages(limit, RAKUTEN_PAGE_SIZE, fetch)
 
-    return items
+    # キーワードごとの検索を並行して実行する(レートはget_requests側で制御)
+    return await fan_out(keywords, search, on_batch=on_batch)
 
 
 def parse_item(keyword: str, search_type: SearchType, data: dict[str, Any]) -> list[dict[str, Any]]:
@@ -1,15 +1,18 @@
 # search/yahoo.py
 
-import asyncio
 import logging
 import os
-from typing import Any
+from typing import Any, Optional
 
 import httpx
-from app.models.enums import SearchType
+from app.models.enums import SearchType, Store
+from app.services.fan_out import BatchCallback, fan_out
 from app.services.http_request import get_requests
+from app.services.pagination import fetch_pages
 
 YAHOO_APP_ID = os.getenv("YAHOO_APP_ID")
+# 1回のリクエストで取得できる件数の上限
+YAHOO_PAGE_SIZE = 100
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,56 +35,65 @@ async def search_yahoo_items_by_keyword(keyword: str, option: dict[str, Any]) ->
     return await _search_yahoo_items([keyword], option_for_keyword)
 
 
-async def search_yahoo_items_by_jan_code(jan_codes: list[str], option: dict[str, Any]) -> list[dict[str, Any]]:
+async def search_yahoo_items_by_jan_code(
+    jan_codes: list[str], option: dict[str, Any], on_batch: Optional[BatchCallback] = None
+) -> list[dict[str, Any]]:
     """
     Search Yahoo products by JAN code.
 
     Args:
         jan_codes (list): JAN codes for searching.
         option (dict): Options for Searching.
+        on_batch (Callable): Called with the results of each JAN code as soon as they arrive.
     Returns:
         list: Yahoo product search results.
     """
-    return await _search_yahoo_items(jan_codes, option)
+    return await _search_yahoo_items(jan_codes, option, on_batch)
 
 
-async def _search_yahoo_items(keywords: list[str], option: dict[str, Any]) -> list[dict[str, Any]]:
+async def _search_yahoo_items(
+    keywords: list[str], option: dict[str, Any], on_batch: Optional[BatchCallback] = None
+) -> list[dict[str, Any]]:
     """
     Search Yahoo products.
 
     Args:
         keywords (list): Search keyword or jan codes.
         option (dict): Options for Searching.
+        on_batch (Callable): Called with the results of each keyword as soon as they arrive.
     Returns:
         list: Yahoo product search results.
     """
 
-    items: list[dict[str, Any]] = []
-    async with httpx.AsyncClient() as client:
-        search_url: str = "https://shopping.yahooapis.jp/ShoppingWebService/V3/itemSearch"
-        search_params: dict[str, Any] = {
-            "appid": YAHOO_APP_ID,
-            "results": option["search_result_limit"],
-            "in_stock": True,
-        }
+    search_url: str = "https://shopping.yahooapis.jp/ShoppingWebService/V3/itemSearch"
+    search_params: dict[str, Any] = {
+        "appid": YAHOO_APP_ID,
+        "in_stock": True,
+    }
 
-        for keyword in keywords:
+    async def search(keyword: str) -> Optional[list[dict[str, Any]]]:
+        async def fetch(offset: int, size: int) -> Optional[tuple[list[dict[str, Any]], Optional[int]]]:
             try:
-                # 429のエラーを発生させないためにsleepを入れる(0.5だと429発生)
-                await asyncio.sleep(0.6)
-
+                params: dict[str, Any] = {**search_params, "results": size}
+                if offset > 0:
+                    params["start"] = offset + 1
                 if option["search_type"] == SearchType.JAN_CODE:
-                    search_params["jan_code"] = keyword
+                    params["jan_code"] = keyword
                 else:
-                    search_params["query"] = keyword
+                    params["query"] = keyword
 
-                data: dict[str, Any] = await get_requests(search_url, params=search_params)
+                data: dict[str, Any] = await get_requests(search_url, params=params, store=Store.YAHOO)
 
-                items.extend(parse_item(data))
-            except httpx.HTTPStatusError as e:
+                return parse_item(data), data.get("totalResultsAvailable")
+            except httpx.HTTPError as e:
                 logger.warning(f"Yahoo request failed for {keyword}: {e}")
+                return None
+
+        # 上限を超える件数は1ページ目の総件数を見て、存在するページだけを並行して取得する
+        return await fetch_pages(option["search_result_limit"], YAHOO_PAGE_SIZE, fetch)
 
-    return items
+    # キーワードごとの検索を並行して実行する(レートはget_requests側で制御)
+    return await fan_out(keywords, search, on_batch=on_batch)
 
 
 def parse_item(data: dict[str, Any]) -> list[dict[str, Any]]:
@@ -0,0 +1,230 @@
+# utils/cache.py
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory used by a JSON-compatible value from its serialized size.
+
+    Args:
+        value (any): Value to measure.
+    Returns:
+        int: Size in bytes.
+    """
+
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode())
+
+
+class TTLCache(Generic[V]):
+    """
+    An LRU cache whose entries expire after a time to live.
+    Expired entries can still be read as stale until stale_ttl has also passed.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        max_entries: int = 1024,
+        max_bytes: int = 0,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            ttl (float): Seconds an entry stays fresh.
+            stale_ttl (float): Seconds an entry can be served as stale after it expired.
+            max_entries (int): Maximum number of entries.
+            max_bytes (int): Maximum total size of the entries. 0 for no limit.
+            sizeof (Callable): Function that returns the size of a value in bytes.
+        """
+
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.entries: OrderedDict[Hashable, tuple[V, float, int]] = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> tuple[Optional[V], bool]:
+        """
+        Get an entry.
+
+        Args:
+            key (Hashable): Cache key.
+        Returns:
+            tuple: The value (None if missing) and whether it is fresh.
+        """
+
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+
+        value, stored_at, _ = entry
+        age = time.monotonic() - stored_at
+        if age > self.ttl + self.stale_ttl:
+            self._delete(key)
+            self.misses += 1
+            return None, False
+
+        self.entries.move_to_end(key)
+        if age > self.ttl:
+            self.stale_hits += 1
+            return value, False
+
+        self.hits += 1
+        return value, True
+
+    def set(self, key: Hashable, value: V) -> None:
+        """
+        Store an entry, evicting the least recently used entries beyond the bounds.
+
+        Args:
+            key (Hashable): Cache key.
+            value (V): Value to store.
+        """
+
+        if key in self.entries:
+            self._delete(key)
+
+        size = self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            return
+
+        self.entries[key] = (value, time.monotonic(), size)
+        self.total_bytes += size
+        while len(self.entries) > self.max_entries or (self.max_bytes and self.total_bytes > self.max_bytes):
+            self._delete(next(iter(self.entries)))
+            self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: Number of hits, stale hits, misses, evictions, entries and bytes.
+        """
+
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+        }
+
+    def _delete(self, key: Hashable) -> None:
+        """
+        Remove an entry.
+
+        Args:
+            key (Hashable): Cache key.
+        """
+
+        _, _, size = self.entries.pop(key)
+        self.total_bytes -= size
+
+
+class StaleWhileRevalidateCache(Generic[V]):
+    """
+    A cache of computed values that serves stale entries while refreshing them in the background.
+    Empty values are never stored, and if the refresh fails or comes back empty, the stale entry keeps being served.
+    """
+
+    def __init__(self, cache: TTLCache[V]) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            cache (TTLCache): Storage of the values. Its stale_ttl bounds how long stale values are served.
+        """
+
+        self.cache = cache
+        self.refreshing: dict[Hashable, asyncio.Task] = {}
+        self.refresh_failures = 0
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[V]],
+        cacheable: Callable[[V], bool] = lambda value: True,
+    ) -> V:
+        """
+        Get a cached value, computing it on a miss. Empty values are returned without being stored.
+
+        Args:
+            key (Hashable): Cache key.
+            compute (Callable): Coroutine function that computes the value.
+            cacheable (Callable): Whether a computed value may be stored, e.g. False for partial results.
+        Returns:
+            V: Cached or computed value.
+        """
+
+        value, fresh = self.cache.get(key)
+        if value is not None:
+            if not fresh and key not in self.refreshing:
+                # 古い値を返しつつバックグラウンドで更新する
+                self.refreshing[key] = asyncio.create_task(self._refresh(key, compute, cacheable))
+            return value
+
+        value = await compute()
+        if value and cacheable(value):
+            # 空の結果は上流の障害による可能性があるため、更新時と同じくキャッシュしない
+            self.cache.set(key, value)
+        return value
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: Counters of the storage and the number of failed refreshes.
+        """
+
+        return {**self.cache.stats(), "refresh_failures": self.refresh_failures}
+
+    async def _refresh(
+        self, key: Hashable, compute: Callable[[], Awaitable[V]], cacheable: Callable[[V], bool]
+    ) -> None:
+        """
+        Recompute a value and store it.
+        The stale value is kept if the computation fails or returns an empty or non-cacheable value.
+
+        Args:
+            key (Hashable): Cache key.
+            compute (Callable): Coroutine function that computes the value.
+            cacheable (Callable): Whether a computed value may be stored.
+        """
+
+        try:
+            value = await compute()
+            if not value:
+                # 上流の障害で空になった可能性があるため、古い値を残す
+                raise ValueError("empty result")
+            if not cacheable(value):
+                raise ValueError("partial result")
+            self.cache.set(key, value)
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.warning(f"Failed to refresh cache entry {key}: {e}")
+        finally:
+            self.refreshing.pop(key, None)
@@ -0,0 +1,228 @@
+# utils/circuit_breaker.py
+
+import logging
+import os
+import time
+from collections import deque
+from typing import Optional
+
+from app.models.enums import Store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 失敗率がこの値以上になったら遮断する(0以下で無効)
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+# 失敗率を判定するために必要な直近のリクエスト数
+CIRCUIT_MIN_REQUESTS = int(os.getenv("CIRCUIT_MIN_REQUESTS", "10"))
+# 失敗率を集計する期間(秒)
+CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "30"))
+# 遮断してから試行を再開するまでの時間(秒)
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+# 試行中に通すリクエスト数
+CIRCUIT_HALF_OPEN_REQUESTS = int(os.getenv("CIRCUIT_HALF_OPEN_REQUESTS", "2"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker that stops sending requests to an upstream API while it keeps failing.
+    It opens when the failure rate of the recent requests reaches the threshold, and after a while
+    lets a limited number of probe requests through. The circuit closes again when all of them succeed.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float,
+        min_requests: int = 10,
+        window: float = 30.0,
+        open_seconds: float = 30.0,
+        half_open_requests: int = 1,
+    ) -> None:
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_rate (float): Ratio of failed requests that opens the circuit.
+            min_requests (int): Number of recent requests needed before the failure rate is evaluated.
+            window (float): Seconds the outcomes of the requests are kept.
+            open_seconds (float): Seconds requests are rejected before probing.
+            half_open_requests (int): Number of probe requests let through while half-open.
+        """
+
+        self.failure_rate = failure_rate
+        self.min_requests = max(min_requests, 1)
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_requests = max(half_open_requests, 1)
+        self.state = CLOSED
+        # 状態が変わるたびに増やし、前の状態で送られたリクエストの結果を区別する
+        self.generation = 0
+        # 直近のリクエストの(完了時刻, 失敗したか)
+        self.outcomes: deque[tuple[float, bool]] = deque()
+        self.opened_at = 0.0
+        self.probes = 0
+        self.probe_successes = 0
+        self.rejected = 0
+
+    def is_open(self) -> bool:
+        """
+        Check whether requests are being rejected without consuming a probe.
+
+        Returns:
+            bool: True while the circuit is open and not ready to probe, or all probes are in flight.
+        """
+
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at < self.open_seconds
+        if self.state == HALF_OPEN:
+            return self.probes >= self.half_open_requests
+        return False
+
+    def allow(self) -> Optional[int]:
+        """
+        Check whether a request may be sent. While half-open, an allowed request is counted as a probe.
+
+        Returns:
+            int: Generation of the circuit the request was allowed in, to be passed to record().
+                None if the request must not be sent.
+        """
+
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self._change(HALF_OPEN)
+            self.probes = 0
+            self.probe_successes = 0
+
+        if self.state == CLOSED:
+            return self.generation
+        if self.state == HALF_OPEN and self.probes < self.half_open_requests:
+            self.probes += 1
+            return self.generation
+
+        self.rejected += 1
+        return None
+
+    def record(self, generation: int, failed: Optional[bool], name: str = "") -> None:
+        """
+        Record the outcome of an allowed request.
+        Outcomes of requests allowed before the circuit last changed state are ignored,
+        so that only the probes decide whether a half-open circuit closes.
+
+        Args:
+            generation (int): Value returned by allow() for the request.
+            failed (bool): Whether the upstream failed. None if the request was abandoned before a response.
+            name (str): Name of the upstream for logging.
+        """
+
+        if generation != self.generation:
+            return
+
+        if self.state == HALF_OPEN:
+            if failed is None:
+                # 応答を待たずに中断された試行は数えない
+                self.probes = max(self.probes - 1, 0)
+            elif failed:
+                self._open(name)
+            else:
+                self.probe_successes += 1
+                if self.probe_successes >= self.half_open_requests:
+                    logger.info(f"Circuit for {name} closed")
+                    self._change(CLOSED)
+                    self.outcomes.clear()
+            return
+
+        if self.state != CLOSED or failed is None:
+            return
+
+        now = time.monotonic()
+        self.outcomes.append((now, failed))
+        while self.outcomes and now - self.outcomes[0][0] > self.window:
+            self.outcomes.popleft()
+
+        if len(self.outcomes) >= self.min_requests:
+            failures = sum(1 for _, outcome in self.outcomes if outcome)
+            if failures / len(self.outcomes) >= self.failure_rate:
+                self._open(name)
+
+    def stats(self) -> dict[str, object]:
+        """
+        Get the state of the breaker.
+
+        Returns:
+            dict: State, number of recent requests and failures, and number of rejected requests.
+        """
+
+        return {
+            "state": OPEN if self.state == OPEN and self.is_open() else self.state,
+            "requests": len(self.outcomes),
+            "failures": sum(1 for _, outcome in self.outcomes if outcome),
+            "rejected": self.rejected,
+        }
+
+    def _open(self, name: str) -> None:
+        """
+        Start rejecting requests.
+
+        Args:
+            name (str): Name of the upstream for logging.
+        """
+
+        logger.warning(f"Circuit for {name} opened for {self.open_seconds:.0f}s")
+        self._change(OPEN)
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+
+    def _change(self, state: str) -> None:
+        """
+        Change the state of the circuit.
+
+        Args:
+            state (str): New state.
+        """
+
+        self.state = state
+        self.generation += 1
+
+
+__breakers: dict[Store, Optional[CircuitBreaker]] = {}
+
+
+def get_circuit_breaker(store: Store) -> Optional[CircuitBreaker]:
+    """
+    Get the circuit breaker shared by every request to the store.
+
+    Args:
+        store (Store): Enumerated stores.
+    Returns:
+        CircuitBreaker: The store's breaker, or None if the circuit breaker is disabled.
+    """
+
+    if store not in __breakers:
+        __breakers[store] = (
+            CircuitBreaker(
+                CIRCUIT_FAILURE_RATE,
+                CIRCUIT_MIN_REQUESTS,
+                CIRCUIT_WINDOW_SECONDS,
+                CIRCUIT_OPEN_SECONDS,
+                CIRCUIT_HALF_OPEN_REQUESTS,
+            )
+            if CIRCUIT_FAILURE_RATE > 0
+            else None
+        )
+    return __breakers[store]
+
+
+def is_failure(status_code: int) -> bool:
+    """
+    Check whether a response status means the upstream is unhealthy.
+
+    Args:
+        status_code (int): HTTP status code.
+    Returns:
+        bool: True for throttling (429) and server errors (5xx).
+    """
+
+    return status_code == 429 or status_code >= 500
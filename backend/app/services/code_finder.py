@@ -1,4 +1,5 @@
 import re
+import unicodedata
 from typing import Callable
 
 
@@ -36,6 +37,38 @@ def find_jan_code(targets: list[str]) -> str:
     return jan_code
 
 
+def parse_jan_codes(text: str) -> list[str]:
+    """
+    Parse input that consists only of JAN codes (13, 8 digits), such as the input of a barcode scanner.
+    Full-width digits are folded and codes can be separated by spaces or commas.
+
+    Args:
+        text (str): Input string.
+    Returns:
+        list: JAN codes in input order without duplicates.
+            Empty if the input contains anything other than valid JAN codes.
+    """
+
+    # 全角数字などを半角に揃えてから区切る
+    tokens: list[str] = re.split(r"[\s,]+", unicodedata.normalize("NFKC", text).strip())
+    if not all(is_jan_code(token) for token in tokens):
+        return []
+    return list(dict.fromkeys(tokens))
+
+
+def is_jan_code(code: str) -> bool:
+    """
+    Check for a 13 or 8 digit JAN code with a valid check digit.
+
+    Args:
+        code (str): String to validate.
+    Returns:
+        bool: True if the string is a JAN code, false otherwise.
+    """
+
+    return code.isascii() and len(code) in (8, 13) and __is_valid_jan(code.zfill(13))
+
+
 def __is_valid_jan(code: str) -> bool:
     """
     Check for a 13 digit jan code.
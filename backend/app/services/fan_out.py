@@ -0,0 +1,56 @@
+# utils/fan_out.py
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Optional
+
+# ストアごとに同時に実行する検索の上限
+FAN_OUT_CONCURRENCY = int(os.getenv("FAN_OUT_CONCURRENCY", "5"))
+
+# キーワードごとの検索結果を受け取るコールバック(キーワードの順番, キーワード, 検索結果)
+BatchCallback = Callable[[int, str, list[dict[str, Any]]], Awaitable[None]]
+
+
+async def fan_out(
+    keywords: list[str],
+    search: Callable[[str], Awaitable[Optional[list[dict[str, Any]]]]],
+    concurrency: int = FAN_OUT_CONCURRENCY,
+    on_batch: Optional[BatchCallback] = None,
+) -> list[dict[str, Any]]:
+    """
+    Run the search for each keyword concurrently with a bounded number of tasks in flight.
+    Results are collected as the tasks finish and returned in keyword order.
+
+    Args:
+        keywords (list): Search keyword or jan codes.
+        search (Callable): Coroutine function that searches one keyword. Returns None if the search failed.
+        concurrency (int): Maximum number of searches running at the same time.
+        on_batch (Callable): Called with the results of each keyword as soon as its search finishes.
+            Not called for failed searches.
+    Returns:
+        list: Search results of all keywords.
+    """
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(index: int, keyword: str) -> tuple[int, Optional[list[dict[str, Any]]]]:
+        async with semaphore:
+            return index, await search(keyword)
+
+    results: list[list[dict[str, Any]]] = [[] for _ in keywords]
+    tasks = [asyncio.create_task(run(index, keyword)) for index, keyword in enumerate(keywords)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            index, items = await task
+            if items is None:
+                continue
+
+            results[index] = items
+            if on_batch is not None:
+                await on_batch(index, keywords[index], items)
+    finally:
+        # 呼び出し元が取り消された場合や失敗した場合は、残りの検索も止める
+        for task in tasks:
+            task.cancel()
+
+    return [item for items in results for item in items]
@@ -1,15 +1,21 @@
 # utils/formatter.py
 
-import difflib
 import re
 from typing import Any, Optional
 
-from app.models.enums import SearchType, Store
+from app.models.enums import SearchType, SimilarityEngine, Store
 from app.models.product_data import ProductItem, WorkProductItem
 from app.services.code_counter import ThreadSafeCodeCounter
-from app.services.translator import translate_to_japanese
+from app.services.name_index import NameIndex
+from app.services.similarity_matrix import match_names
+from app.services.similarity_scorer import PruningStats, SimilarityScorer
+from app.services.translator import translate_all_to_japanese
+
+STORE_ORDER: list[Store] = [Store.YAHOO, Store.RAKUTEN, Store.EBAY]
 
 counter: ThreadSafeCodeCounter = ThreadSafeCodeCounter()
+# 類似度判定の枝刈り状況(ベンチマーク用)
+similarity_stats: PruningStats = PruningStats()
 
 
 async def format(
@@ -38,69 +44,234 @@ async def format(
     """
 
     # 商品データのグルーピング
-    grouped_items: dict[str, WorkProductItem] = await _group_product_data(yahoo_items, {}, option, Store.YAHOO)
-    grouped_items = await _group_product_data(rakuten_items, grouped_items, option, Store.RAKUTEN)
-    grouped_items = await _group_product_data(ebay_items, grouped_items, option, Store.EBAY)
+    aggregator = ProductAggregator(option)
+    for store, items in ((Store.YAHOO, yahoo_items), (Store.RAKUTEN, rakuten_items), (Store.EBAY, ebay_items)):
+        await aggregator.add(store, items)
+        aggregator.complete(store)
 
     # 商品データを整形して返す
-    return _format_grouped_items(grouped_items)
+    return aggregator.result()
+
+
+class ProductAggregator:
+    """
+    Group product data incrementally as search results arrive from each store in any order.
+    The result is the same as grouping Yahoo, Rakuten and eBay in this order, whatever the arrival order.
+
+    When grouping by JAN code, each batch is grouped as soon as it arrives.
+    When grouping by product name, the result depends on the order, so batches are grouped
+    as soon as all batches before them in store order have been grouped.
+    """
+
+    def __init__(self, option: dict[str, Any]) -> None:
+        """
+        Initialize the aggregator.
+
+        Args:
+            option (dict): Options for grouping.
+        """
+
+        self.option = option
+        self.grouped_items: dict[str, WorkProductItem] = {}
+        self.first_ranks: dict[str, tuple[int, int, int]] = {}
+        self.pending: dict[Store, dict[int, tuple[list[dict[str, Any]], dict[str, str]]]] = {
+            store: {} for store in STORE_ORDER
+        }
+        self.next_seq: dict[Store, int] = {store: 0 for store in STORE_ORDER}
+        self.completed: set[Store] = set()
+        self.changed: set[str] = set()
+
+    async def add(self, store: Store, items: list[dict[str, Any]], seq: int = 0) -> None:
+        """
+        Add a batch of search results.
+
+        Args:
+            store (Store): The store the results came from.
+            items (list): Search results.
+            seq (int): Order of the batch within the store, starting from 0.
+        """
+
+        if self.option["search_type"] == SearchType.JAN_CODE:
+            _group_by_jan_code(items, self.grouped_items, store, self.first_ranks, seq)
+            self.changed.update(item["jan_code"] for item in items if item.get("jan_code"))
+            return
+
+        translated_names: dict[str, str] = {}
+        if store == Store.EBAY:
+            # 順番待ちの間に商品名の翻訳を済ませておく
+            translated_names = await translate_all_to_japanese([item.get("product_name", "") for item in items])
+
+        self.pending[store][seq] = (items, translated_names)
+        self._apply_pending()
+
+    def complete(self, store: Store) -> None:
+        """
+        Mark that no more batches will arrive from the store.
+
+        Args:
+            store (Store): The completed store.
+        """
+
+        self.completed.add(store)
+        if self.option["search_type"] != SearchType.JAN_CODE:
+            self._apply_pending()
 
+    def result(self) -> list[ProductItem]:
+        """
+        Format the product data grouped so far.
 
-async def _group_product_data(
-    org_items: list[dict[str, Any]], grouped_items: dict[str, WorkProductItem], option: dict[str, Any], store: Store
+        Returns:
+            list: Formatted product data.
+        """
+
+        return _format_grouped_items({code: self.grouped_items[code] for code in self._ordered_codes()})
+
+    def drain_changes(self) -> list[ProductItem]:
+        """
+        Format the groups that changed since the last call.
+
+        Returns:
+            list: Formatted product data of the changed groups.
+        """
+
+        changed = self.changed
+        self.changed = set()
+        return _format_grouped_items(
+            {code: self.grouped_items[code] for code in self._ordered_codes() if code in changed}
+        )
+
+    def count_offered(self, min_stores: int = 1) -> int:
+        """
+        Count the groups offered by at least the given number of stores.
+
+        Args:
+            min_stores (int): Minimum number of stores with prices.
+        Returns:
+            int: Number of groups.
+        """
+
+        return sum(
+            1
+            for item in self.grouped_items.values()
+            if sum(1 for store in STORE_ORDER if item.offer(store).count > 0) >= min_stores
+        )
+
+    def _ordered_codes(self) -> list[str]:
+        """
+        Get the group keys in output order.
+
+        Returns:
+            list: Group keys.
+        """
+
+        if self.option["search_type"] == SearchType.JAN_CODE:
+            # 到着順によらず、ストア順に処理した場合と同じ並びにする
+            return sorted(self.grouped_items, key=self.first_ranks.__getitem__)
+        return list(self.grouped_items)
+
+    def _apply_pending(self) -> None:
+        """
+        Group the pending batches that are next in store order.
+        """
+
+        for store in STORE_ORDER:
+            pending = self.pending[store]
+            while pending and (self.next_seq[store] in pending or store in self.completed):
+                # 完了したストアは届かなかったバッチを飛ばして適用する
+                seq = self.next_seq[store] if self.next_seq[store] in pending else min(pending)
+                items, translated_names = pending.pop(seq)
+                self.next_seq[store] = seq + 1
+
+                # 価格が追加されたグループと新規のグループを変更ありとする
+                before = {code: (id(item), item.offer(store).count) for code, item in self.grouped_items.items()}
+                self.grouped_items = _group_product_data(
+                    items, self.grouped_items, self.option, store, translated_names
+                )
+                self.changed.update(
+                    code
+                    for code, item in self.grouped_items.items()
+                    if before.get(code) != (id(item), item.offer(store).count)
+                )
+
+            if store not in self.completed:
+                break
+
+
+def _group_product_data(
+    org_items: list[dict[str, Any]],
+    grouped_items: dict[str, WorkProductItem],
+    option: dict[str, Any],
+    store: Store,
+    translated_names: dict[str, str],
 ) -> dict[str, WorkProductItem]:
     """
-    Add product data to the grouped product data.
+    Add product data to the grouped product data by product name.
 
     Args:
         org_items (list): eBay search results.
         grouped_items (dict): Combined product data.
         option (dict): Options for grouping.
+        store (Store): Enumerated stores.
+        translated_names (dict): Translated product names keyed by the original names.
     Returns:
         dict: Combined product data.
     """
 
-    if option["search_type"] == SearchType.JAN_CODE:
-        # 商品の整形(JANコードあり)
-        grouped_items = _group_by_jan_code(org_items, grouped_items, store)
+    # 商品の整形(JANコードなし)
+    if option.get("similarity_engine") == SimilarityEngine.VECTOR:
+        grouped_items = _group_by_product_name_vector(org_items, grouped_items, store, option, translated_names)
     else:
-        # 商品の整形(JANコードなし)
-        grouped_items = await _group_by_product_name(org_items, grouped_items, store, option)
+        grouped_items = _group_by_product_name(org_items, grouped_items, store, option, translated_names)
 
     return grouped_items
 
 
 def _group_by_jan_code(
-    org_items: list[dict[str, Any]], grouped_items: dict[str, WorkProductItem], store: Store
+    org_items: list[dict[str, Any]],
+    grouped_items: dict[str, WorkProductItem],
+    store: Store,
+    first_ranks: dict[str, tuple[int, int, int]],
+    seq: int = 0,
 ) -> dict[str, WorkProductItem]:
     """
     Group product data by JAN code.
+    Each item is ranked by store order, batch order and position so that the result does not depend on arrival order.
 
     Args:
         org_items (list): Product data to group.
         grouped_items (dict): Combined product data.
         store (Store): Enumerated stores.
+        first_ranks (dict): Rank of the first item of each group. Updated in place.
+        seq (int): Order of the batch within the store.
     Returns:
         dict: Result of grouping org_items into grouped_items.
     """
 
-    for item in (item for item in org_items if item.get("jan_code")):
-        jan_code = item["jan_code"]
+    store_rank = STORE_ORDER.index(store)
+    for index, item in enumerate(org_items):
+        jan_code = item.get("jan_code")
+        if not jan_code:
+            continue
 
+        rank = (store_rank, seq, index)
         # 存在しなければ新規作成
         if jan_code not in grouped_items:
             grouped_items[jan_code] = _create_initial_work_product_item()
+            first_ranks[jan_code] = rank
+        else:
+            first_ranks[jan_code] = min(first_ranks[jan_code], rank)
 
-        _update_item_in_grouped_items(grouped_items[jan_code], item, store)
+        _update_item_in_grouped_items(grouped_items[jan_code], item, store, rank)
 
     return grouped_items
 
 
-async def _group_by_product_name(
+def _group_by_product_name(
     org_items: list[dict[str, Any]],
     grouped_items: dict[str, WorkProductItem],
     store: Store,
     option: dict[str, Any],
+    translated_names: dict[str, str],
 ) -> dict[str, WorkProductItem]:
     """
     Group product data by product name.
@@ -110,32 +281,42 @@ async def _group_by_product_name(
         grouped_items (dict): Combined product data.
         store (Store): Enumerated stores.
         option (dict): Options for grouping.
+        translated_names (dict): Translated product names keyed by the original names.
     Returns:
         dict: Result of grouping org_items into grouped_items.
     """
 
+    # 既存グループの正規化した商品名を索引に登録し、類似度の閾値に届きうるグループだけを比較する
+    threshold = option.get("similarity_threshold", 0.5)
+    scorer = SimilarityScorer(threshold, similarity_stats)
+    index = NameIndex()
+    group_names: dict[str, str] = {}
+
+    def register(code: str) -> None:
+        group_names[code] = _normalize_text(_get_group_name(grouped_items[code]))
+        index.add(code, group_names[code])
+
+    for jan_code in grouped_items:
+        register(jan_code)
+
     for item in (item for item in org_items):
         current_product_name_from_item = item.get("product_name", "")
-        product_name_to_use_in_update = current_product_name_from_item
-
-        # ebayの場合は商品名を日本語に変換
-        if store == Store.EBAY:
-            product_name_to_use_in_update = await translate_to_japanese(current_product_name_from_item)
+        product_name_to_use_in_update = translated_names.get(
+            current_product_name_from_item, current_product_name_from_item
+        )
 
         match_flg: bool = False
-        for jan_code in list(grouped_items.keys()):
-            yahoo_name = grouped_items[jan_code]["product_name"][Store.YAHOO.value]
-            rakuten_name = grouped_items[jan_code]["product_name"][Store.RAKUTEN.value]
-            ebay_name = grouped_items[jan_code]["product_name"][Store.EBAY.value]
-            target_name = str(yahoo_name or rakuten_name or ebay_name)
-
-            if _is_similarity(target_name, current_product_name_from_item, product_name_to_use_in_update, option):
+        names = {_normalize_text(current_product_name_from_item), _normalize_text(product_name_to_use_in_update)}
+        matchers = [scorer.matcher(name) for name in names]
+        for jan_code in index.candidates(names, threshold):
+            if any(scorer.is_similar(group_names[jan_code], matcher) for matcher in matchers):
                 # 類似度が高い場合、同一商品とみなし既存の項目を更新
                 _update_item_in_grouped_items(
                     grouped_items[jan_code],
                     item,
                     store,
                 )
+                register(jan_code)
                 match_flg = True
                 break
 
@@ -149,40 +330,90 @@ async def _group_by_product_name(
                 item,
                 store,
             )
+            register(code)
+
+    return grouped_items
+
+
+def _group_by_product_name_vector(
+    org_items: list[dict[str, Any]],
+    grouped_items: dict[str, WorkProductItem],
+    store: Store,
+    option: dict[str, Any],
+    translated_names: dict[str, str],
+) -> dict[str, WorkProductItem]:
+    """
+    Group product data by product name using the similarity matrix engine.
+    The similarity_threshold is compared with the cosine similarity of character n-grams,
+    and group names are taken as they are before this store's items are added.
+
+    Args:
+        org_items (list): Product data to group.
+        grouped_items (dict): Combined product data.
+        store (Store): Enumerated stores.
+        option (dict): Options for grouping.
+        translated_names (dict): Translated product names keyed by the original names.
+    Returns:
+        dict: Result of grouping org_items into grouped_items.
+    """
+
+    group_codes: list[str] = list(grouped_items.keys())
+    product_names: list[str] = [item.get("product_name", "") for item in org_items]
+    assignments = match_names(
+        [_normalize_text(name) for name in product_names],
+        [_normalize_text(translated_names.get(name, name)) for name in product_names],
+        [_normalize_text(_get_group_name(grouped_items[code])) for code in group_codes],
+        option.get("similarity_threshold", 0.5),
+    )
+
+    created_codes: dict[int, str] = {}
+    for i, (item, column) in enumerate(zip(org_items, assignments)):
+        if column < len(group_codes):
+            code = group_codes[column]
+        elif column - len(group_codes) != i:
+            code = created_codes[column - len(group_codes)]
+        else:
+            # 1件もマッチしなかった場合は別途追加する
+            code = str(item.get("jan_code") if item.get("jan_code") else "No-" + str(counter.get_next()))
+            grouped_items[code] = _create_initial_work_product_item()
+            created_codes[i] = code
+
+        _update_item_in_grouped_items(grouped_items[code], item, store)
 
     return grouped_items
 
 
+def _get_group_name(grouped_item: WorkProductItem) -> str:
+    """
+    Get the product name used to compare with the group.
+
+    Args:
+        grouped_item (WorkProductItem): Grouped product data.
+    Returns:
+        str: Product name of Yahoo, Rakuten or eBay, in order of priority.
+    """
+
+    return str(grouped_item.yahoo.product_name or grouped_item.rakuten.product_name or grouped_item.ebay.product_name)
+
+
 def _update_item_in_grouped_items(
     target_grouped_item: WorkProductItem,
     source_item_data: dict[str, Any],
     store: Store,
+    rank: tuple[int, ...] = (),
 ) -> None:
     """
     grouped_items内の既存または新規のWorkProductItemの情報を更新します。
-    最安値のロジックを含みます。
+    価格の最小値・最大値・件数を更新し、最安値の場合は対象の商品として保持します。
 
     Args:
         target_grouped_item (WorkProductItem): 更新対象となるgrouped_items内のWorkProductItemオブジェクト。
         source_item_data (dict): 更新に使用する元のアイテムデータ（org_itemsの各item）。
-        store_value (str): 現在処理しているストアの文字列値（"yahoo", "rakuten"など）。
-        current_product_name (Optional[str]): _group_by_product_nameからの呼び出し時に、
-                                                item.get("product_name")の代わりに設定したい商品名。
-                                                Noneの場合はsource_item_dataから取得。
+        store (Store): 現在処理しているストア。
+        rank (tuple): 同額の場合に優先する順位(小さいほど優先)。省略時は先に追加した商品を優先。
     """
     current_price_float = _get_safe_price(source_item_data.get("price"))
-    target_grouped_item["work_price"][store.value].append(current_price_float)
-
-    existing_target_price_for_store = target_grouped_item["target_price"][store.value]
-
-    # 最安値の更新ロジック
-    # current_price_float が有効な数値である場合に、target_priceと比較して更新
-    if current_price_float is not None:
-        if existing_target_price_for_store is None or current_price_float < existing_target_price_for_store:
-            target_grouped_item["product_name"][store.value] = source_item_data.get("product_name")
-            target_grouped_item["target_price"][store.value] = current_price_float
-            target_grouped_item["url"][store.value] = source_item_data.get("url")
-            target_grouped_item["image_url"][store.value] = source_item_data.get("image_url")
+    target_grouped_item.offer(store).add(current_price_float, source_item_data, rank)
 
 
 def _get_safe_price(raw_price):
@@ -194,33 +425,8 @@ def _get_safe_price(raw_price):
     return None
 
 
-def _create_initial_work_product_item():
-    return {
-        "product_name": {"yahoo": None, "rakuten": None, "ebay": None},
-        "work_price": {"yahoo": [], "rakuten": [], "ebay": []},
-        "target_price": {"yahoo": None, "rakuten": None, "ebay": None},
-        "url": {"yahoo": None, "rakuten": None, "ebay": None},
-        "image_url": {"yahoo": None, "rakuten": None, "ebay": None},
-    }
-
-
-def _is_similarity(org_text: str, target_text1: str, target_text2: str, option: dict[str, Any]) -> bool:
-    """
-    Check if the specified trade names are similar.
-
-    Args:
-        org_text (str): The name of the product to be compared.
-        target_text1 (str): The product name to compare.
-        target_text2 (str): The translated product name to compare.
-        option (dict): Options for grouping.
-    Returns:
-        bool: True if the approximation exceeds the threshold, False otherwise.
-    """
-
-    norm_org = _normalize_text(org_text)
-    candidates = {_normalize_text(target_text1), _normalize_text(target_text2)}
-    threshold = option.get("similarity_threshold", 0.5)
-    return any(difflib.SequenceMatcher(None, norm_org, t).ratio() >= threshold for t in candidates)
+def _create_initial_work_product_item() -> WorkProductItem:
+    return WorkProductItem()
 
 
 def _normalize_text(text: str) -> str:
@@ -251,32 +457,25 @@ def _format_grouped_items(grouped_items: dict[str, WorkProductItem]) -> list[Pro
     """
     result: list[ProductItem] = []
     for jan_code, item in grouped_items.items():
-        valid_yahoo_prices = [p for p in item["work_price"][Store.YAHOO.value] if p is not None]
-        valid_rakuten_prices = [p for p in item["work_price"][Store.RAKUTEN.value] if p is not None]
-        valid_ebay_prices = [p for p in item["work_price"][Store.EBAY.value] if p is not None]
         result.append(
             {
                 "jan_code": None if jan_code.startswith("No-") else jan_code,
-                "product_name": item["product_name"],
+                "product_name": {
+                    "yahoo": item.yahoo.product_name,
+                    "rakuten": item.rakuten.product_name,
+                    "ebay": item.ebay.product_name,
+                },
                 "price": {
-                    "yahoo": {
-                        "min": min(valid_yahoo_prices) if valid_yahoo_prices else None,
-                        "max": max(valid_yahoo_prices) if valid_yahoo_prices else None,
-                        "target": item["target_price"][Store.YAHOO.value],
-                    },
-                    "rakuten": {
-                        "min": min(valid_rakuten_prices) if valid_rakuten_prices else None,
-                        "max": max(valid_rakuten_prices) if valid_rakuten_prices else None,
-                        "target": item["target_price"][Store.RAKUTEN.value],
-                    },
-                    "ebay": {
-                        "min": min(valid_ebay_prices) if valid_ebay_prices else None,
-                        "max": max(valid_ebay_prices) if valid_ebay_prices else None,
-                        "target": item["target_price"][Store.EBAY.value],
-                    },
+                    "yahoo": item.yahoo.to_price_info(),
+                    "rakuten": item.rakuten.to_price_info(),
+                    "ebay": item.ebay.to_price_info(),
+                },
+                "url": {"yahoo": item.yahoo.url, "rakuten": item.rakuten.url, "ebay": item.ebay.url},
+                "image_url": {
+                    "yahoo": item.yahoo.image_url,
+                    "rakuten": item.rakuten.image_url,
+                    "ebay": item.ebay.image_url,
                 },
-                "url": item["url"],
-                "image_url": item["image_url"],
             }
         )
 
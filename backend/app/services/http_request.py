@@ -1,11 +1,72 @@
 # # utils/http_request.py
 
-from typing import Any
+import os
+from typing import Any, Optional
 
-import requests
+import httpx
+from app.models.enums import Store
+from app.services.circuit_breaker import get_circuit_breaker, is_failure
+from app.services.rate_limiter import get_rate_limiter, parse_retry_after
+from app.services.single_flight import SingleFlight
 
+# 接続プールとタイムアウトの設定(環境変数で上書き可能)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30.0"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5.0"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10.0"))
 
-async def get_requests(url: str, headers: dict[str, str] = {}, params: dict[str, Any] = {}) -> Any:
+__clients: dict[Optional[Store], httpx.AsyncClient] = {}
+
+# 同じストア・URL・パラメータへの同時のGETリクエストをまとめる
+get_flights = SingleFlight()
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """
+    Raised instead of sending a request while the circuit of the store is open.
+    """
+
+
+def get_client(store: Optional[Store] = None) -> httpx.AsyncClient:
+    """
+    Get the process-wide HTTP client for the store.
+    Clients are created on first use and keep their connections alive between requests.
+
+    Args:
+        store (Store): The store the requests are sent to. None for other hosts.
+    Returns:
+        httpx.AsyncClient: Pooled asynchronous HTTP client.
+    """
+
+    client = __clients.get(store)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        __clients[store] = client
+    return client
+
+
+async def close_clients() -> None:
+    """
+    Close all HTTP clients and release their connections.
+    """
+
+    clients = list(__clients.values())
+    __clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+async def get_requests(
+    url: str, headers: dict[str, str] = {}, params: dict[str, Any] = {}, store: Optional[Store] = None
+) -> Any:
     """
     Send a GET request with the specified URL and parameters.
 
@@ -13,10 +74,78 @@ async def get_requests(url: str, headers: dict[str, str] = {}, params: dict[str,
         url (str): URL.
         headers (dict): Header information for GET requests.
         params (dict): Parameters used in GET requests.
+        store (Store): The store the request is sent to. Used to select the connection pool and rate limit.
+    Returns:
+        any: HTTP response in JSON format.
+    """
+
+    # 同じリクエストが実行中であれば、レート制限の枠を使わずにその結果を待つ
+    key = (store, url, tuple(sorted((name, str(value)) for name, value in params.items())))
+    return await get_flights.do(key, lambda: _get_requests(url, headers, params, store))
+
+
+async def _get_requests(url: str, headers: dict[str, str], params: dict[str, Any], store: Optional[Store]) -> Any:
+    """
+    Send a GET request, waiting for the rate limit of the store and failing fast while its circuit is open.
+
+    Args:
+        url (str): URL.
+        headers (dict): Header information for GET requests.
+        params (dict): Parameters used in GET requests.
+        store (Store): The store the request is sent to.
+    Returns:
+        any: HTTP response in JSON format.
+    """
+
+    # 障害中のストアにはリクエストを送らずにすぐ失敗させる
+    breaker = get_circuit_breaker(store) if store is not None else None
+    generation = breaker.allow() if breaker is not None else None
+    if store is not None and breaker is not None and generation is None:
+        raise CircuitOpenError(f"Circuit for {store.value} is open")
+
+    failed: Optional[bool] = None
+    try:
+        limiter = get_rate_limiter(store) if store is not None else None
+        if limiter is not None:
+            await limiter.acquire()
+
+        try:
+            response: httpx.Response = await get_client(store).get(url, headers=headers, params=params)
+        except httpx.TransportError:
+            failed = True
+            raise
+        failed = is_failure(response.status_code)
+    finally:
+        if breaker is not None and generation is not None and store is not None:
+            breaker.record(generation, failed, store.value)
+
+    if limiter is not None:
+        # 429やRetry-Afterが返された場合はレートを落とす
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if response.status_code == 429 or retry_after is not None:
+            limiter.slow_down(retry_after)
+        elif response.is_success:
+            limiter.speed_up()
+
+    response.raise_for_status()
+    return response.json()
+
+
+async def post_requests(
+    url: str, headers: dict[str, str] = {}, data: dict[str, Any] = {}, store: Optional[Store] = None
+) -> Any:
+    """
+    Send a form-encoded POST request to the specified URL.
+
+    Args:
+        url (str): URL.
+        headers (dict): Header information for POST requests.
+        data (dict): Form data sent in the request body.
+        store (Store): The store the request is sent to. Used to select the connection pool.
     Returns:
         any: HTTP response in JSON format.
     """
 
-    response: Any = requests.get(url, headers=headers, params=params)
+    response: httpx.Response = await get_client(store).post(url, headers=headers, data=data)
     response.raise_for_status()
     return response.json()
@@ -0,0 +1,29 @@
+# utils/jan_ranker.py
+
+from typing import Any
+
+
+def rank_jan_codes(items: list[dict[str, Any]]) -> list[str]:
+    """
+    Rank the JAN codes found in search results by how likely they are to be the product searched for.
+    Codes hit more often come first, then codes with more priced items, then codes found earlier.
+
+    Args:
+        items (list): Search results with jan_code and price.
+    Returns:
+        list: JAN codes in priority order without duplicates.
+    """
+
+    # JANコードごとの(ヒット数, 価格のある商品数, 最初に見つかった順番)
+    stats: dict[str, list[int]] = {}
+    for index, item in enumerate(items):
+        code = item.get("jan_code")
+        if not code:
+            continue
+
+        stat = stats.setdefault(code, [0, 0, index])
+        stat[0] += 1
+        if item.get("price"):
+            stat[1] += 1
+
+    return sorted(stats, key=lambda code: (-stats[code][0], -stats[code][1], stats[code][2]))
@@ -0,0 +1,168 @@
+# utils/jan_scheduler.py
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Optional
+
+from app.models.enums import Store
+from app.services.fan_out import BatchCallback
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# JANコードの検索をまとめるために待つ時間(ミリ秒)
+JAN_SCHEDULER_WINDOW_MS = float(os.getenv("JAN_SCHEDULER_WINDOW_MS", "5"))
+
+# ストア, JANコード, 取得件数, 結果を受け取るコールバック
+Dispatch = Callable[[Store, list[str], int, BatchCallback], Awaitable[Any]]
+
+
+class LookupBatch:
+    """
+    JAN code lookups of one store and result limit dispatched together.
+    """
+
+    def __init__(self, store: Store, limit: int) -> None:
+        """
+        Initialize the batch.
+
+        Args:
+            store (Store): Store to search.
+            limit (int): Number of items to retrieve.
+        """
+
+        self.store = store
+        self.limit = limit
+        self.futures: dict[str, asyncio.Future] = {}
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+
+
+class JanLookupScheduler:
+    """
+    Collect JAN code lookups from all requests in flight over a short window and search each code once.
+    Lookups of the same store, code and result limit share one upstream search, and the result is routed
+    back to every waiting request. A search is cancelled when all requests waiting for it are cancelled.
+    """
+
+    def __init__(self, dispatch: Dispatch, window: float = JAN_SCHEDULER_WINDOW_MS / 1000) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            dispatch (Callable): Coroutine function that searches a store by JAN codes,
+                calling the callback with the results of each code.
+            window (float): Seconds to wait for other lookups before dispatching.
+        """
+
+        self.dispatch = dispatch
+        self.window = window
+        # (ストア, 取得件数)ごとに、次にまとめて検索するJANコード
+        self.pending: dict[tuple[Store, int], LookupBatch] = {}
+        # (ストア, 取得件数, JANコード)ごとに、実行中の検索
+        self.in_flight: dict[tuple[Store, int, str], LookupBatch] = {}
+        self.requested = 0
+        self.coalesced = 0
+        self.dispatched = 0
+        self.batches = 0
+
+    async def lookup(self, store: Store, jan_code: str, limit: int) -> Optional[list[dict[str, Any]]]:
+        """
+        Search a store by a JAN code together with the other lookups of the window.
+
+        Args:
+            store (Store): Store to search.
+            jan_code (str): JAN code.
+            limit (int): Number of items to retrieve.
+        Returns:
+            list: Items of the JAN code. None if the search failed.
+        """
+
+        self.requested += 1
+        batch = self.in_flight.get((store, limit, jan_code))
+        if batch is None:
+            batch = self.pending.get((store, limit))
+            if batch is None:
+                # 最初の検索から一定時間待ち、その間に届いた検索をまとめて実行する
+                batch = LookupBatch(store, limit)
+                batch.task = asyncio.create_task(self._flush(batch))
+                self.pending[(store, limit)] = batch
+
+        future = batch.futures.get(jan_code)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            batch.futures[jan_code] = future
+        else:
+            self.coalesced += 1
+
+        batch.waiters += 1
+        try:
+            # 一つの呼び出し元がキャンセルされても、他の呼び出し元への結果は止めない
+            return await asyncio.shield(future)
+        finally:
+            batch.waiters -= 1
+            if batch.waiters == 0 and batch.task is not None and not batch.task.done():
+                # 待っている呼び出し元がいなくなった検索は取り消し、以降の検索は新しくまとめる
+                self._discard(batch)
+                batch.task.cancel()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get the lookup counters.
+
+        Returns:
+            dict: Number of requested lookups, coalesced lookups, dispatched codes and dispatched batches.
+        """
+
+        return {
+            "requested": self.requested,
+            "coalesced": self.coalesced,
+            "dispatched": self.dispatched,
+            "batches": self.batches,
+        }
+
+    async def _flush(self, batch: LookupBatch) -> None:
+        """
+        Dispatch the lookups collected in the batch, and route the results.
+
+        Args:
+            batch (LookupBatch): Lookups filled until the window ends.
+        """
+
+        async def on_batch(seq: int, jan_code: str, items: list[dict[str, Any]]) -> None:
+            future = batch.futures.get(jan_code)
+            if future is not None and not future.done():
+                future.set_result(items)
+
+        try:
+            await asyncio.sleep(self.window)
+            del self.pending[(batch.store, batch.limit)]
+            for jan_code in batch.futures:
+                self.in_flight[(batch.store, batch.limit, jan_code)] = batch
+            self.dispatched += len(batch.futures)
+            self.batches += 1
+
+            await self.dispatch(batch.store, list(batch.futures), batch.limit, on_batch)
+        except Exception as e:
+            logger.warning(f"JAN lookups for {batch.store.value} failed: {e}")
+        finally:
+            self._discard(batch)
+            for future in batch.futures.values():
+                # 結果が返らなかった検索は失敗として扱う
+                if not future.done():
+                    future.set_result(None)
+
+    def _discard(self, batch: LookupBatch) -> None:
+        """
+        Stop routing new lookups to the batch.
+
+        Args:
+            batch (LookupBatch): Batch that finished or was cancelled.
+        """
+
+        if self.pending.get((batch.store, batch.limit)) is batch:
+            del self.pending[(batch.store, batch.limit)]
+        for jan_code in batch.futures:
+            if self.in_flight.get((batch.store, batch.limit, jan_code)) is batch:
+                del self.in_flight[(batch.store, batch.limit, jan_code)]
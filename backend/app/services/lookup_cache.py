@@ -0,0 +1,107 @@
+# utils/lookup_cache.py
+
+import os
+from typing import Any, Hashable, Optional
+
+from app.models.enums import Store
+from app.services.cache import TTLCache
+
+# ストアごとのJANコード検索結果の有効期間(秒)
+LOOKUP_CACHE_TTLS: dict[Store, float] = {
+    Store.YAHOO: float(os.getenv("YAHOO_LOOKUP_CACHE_TTL", "600")),
+    Store.RAKUTEN: float(os.getenv("RAKUTEN_LOOKUP_CACHE_TTL", "600")),
+    Store.EBAY: float(os.getenv("EBAY_LOOKUP_CACHE_TTL", "300")),
+}
+
+# 商品が見つからなかったJANコードを覚えておく期間(秒)
+LOOKUP_NEGATIVE_CACHE_TTL = float(os.getenv("LOOKUP_NEGATIVE_CACHE_TTL", "120"))
+
+LOOKUP_CACHE_MAX_ENTRIES = int(os.getenv("LOOKUP_CACHE_MAX_ENTRIES", "4096"))
+
+
+class LookupCache:
+    """
+    Cache of the items found by one store for one JAN code, shared across queries.
+    Codes that returned no items are kept for a shorter time as negative entries.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[dict[Store, float]] = None,
+        negative_ttl: float = LOOKUP_NEGATIVE_CACHE_TTL,
+        max_entries: int = LOOKUP_CACHE_MAX_ENTRIES,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            ttls (dict): Seconds the items of each store stay cached. 0 disables the cache of the store.
+            negative_ttl (float): Seconds an empty result stays cached. 0 disables negative caching.
+            max_entries (int): Maximum number of entries per store.
+        """
+
+        ttls = LOOKUP_CACHE_TTLS if ttls is None else ttls
+        self.caches: dict[Store, TTLCache[list[dict[str, Any]]]] = {
+            store: TTLCache(ttl=ttls.get(store, 0.0), max_entries=max_entries) for store in Store
+        }
+        self.negative_caches: dict[Store, TTLCache[list[dict[str, Any]]]] = {
+            store: TTLCache(ttl=negative_ttl, max_entries=max_entries) for store in Store
+        }
+
+    def get(self, store: Store, key: Hashable) -> Optional[list[dict[str, Any]]]:
+        """
+        Get the cached items of a lookup.
+
+        Args:
+            store (Store): Searched store.
+            key (Hashable): Lookup key such as the JAN code and the result limit.
+        Returns:
+            list: Cached items. None if the lookup is not cached.
+        """
+
+        for cache in (self.caches[store], self.negative_caches[store]):
+            if cache.ttl <= 0:
+                continue
+            items, fresh = cache.get(key)
+            if fresh:
+                return items
+        return None
+
+    def set(self, store: Store, key: Hashable, items: list[dict[str, Any]]) -> None:
+        """
+        Store the items of a lookup.
+
+        Args:
+            store (Store): Searched store.
+            key (Hashable): Lookup key such as the JAN code and the result limit.
+            items (list): Items found by the store.
+        """
+
+        cache = self.caches[store] if items else self.negative_caches[store]
+        if cache.ttl > 0:
+            cache.set(key, items)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        Get the cache counters of each store.
+
+        Returns:
+            dict: Counters of the item cache and the negative cache by store name.
+        """
+
+        return {
+            store.value: {
+                **self.caches[store].stats(),
+                "negative_entries": len(self.negative_caches[store].entries),
+            }
+            for store in Store
+        }
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+
+        for cache in (*self.caches.values(), *self.negative_caches.values()):
+            cache.entries.clear()
+            cache.total_bytes = 0
@@ -0,0 +1,89 @@
+# utils/name_index.py
+
+from collections import Counter
+from typing import Iterable
+
+
+class NameIndex:
+    """
+    An incremental inverted index of normalized group names keyed by character.
+    It narrows the groups that can reach the similarity threshold before the full comparison.
+
+    The candidate check uses the shared character count, which is the same upper bound as
+    difflib.SequenceMatcher.quick_ratio(), so no group that would match is ever left out.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty index.
+        """
+
+        self.order: dict[str, int] = {}
+        self.lengths: dict[str, int] = {}
+        self.counts: dict[str, Counter[str]] = {}
+        self.postings: dict[str, dict[str, int]] = {}
+
+    def add(self, code: str, name: str) -> None:
+        """
+        Add a group name, replacing the previous name of the group if any.
+        A replaced group keeps its original position.
+
+        Args:
+            code (str): Key of the group.
+            name (str): Normalized group name.
+        """
+
+        if code in self.counts:
+            self._remove(code)
+        else:
+            self.order[code] = len(self.order)
+
+        counts = Counter(name)
+        self.lengths[code] = len(name)
+        self.counts[code] = counts
+        for char, count in counts.items():
+            self.postings.setdefault(char, {})[code] = count
+
+    def candidates(self, names: Iterable[str], threshold: float) -> list[str]:
+        """
+        Get the groups whose similarity to any of the names can reach the threshold.
+
+        Args:
+            names (Iterable): Normalized names to compare.
+            threshold (float): Similarity threshold.
+        Returns:
+            list: Keys of the candidate groups in the order they were added.
+        """
+
+        if threshold <= 0:
+            return sorted(self.order, key=self.order.__getitem__)
+
+        matched: set[str] = set()
+        for name in set(names):
+            overlaps: dict[str, int] = dict.fromkeys(self.counts, 0) if not name else {}
+            for char, count in Counter(name).items():
+                for code, group_count in self.postings.get(char, {}).items():
+                    overlaps[code] = overlaps.get(code, 0) + min(count, group_count)
+
+            for code, overlap in overlaps.items():
+                length = self.lengths[code] + len(name)
+                upper_bound = 2.0 * overlap / length if length else 1.0
+                if upper_bound >= threshold:
+                    matched.add(code)
+
+        return sorted(matched, key=self.order.__getitem__)
+
+    def _remove(self, code: str) -> None:
+        """
+        Remove the name of a group from the postings.
+
+        Args:
+            code (str): Key of the group.
+        """
+
+        for char in self.counts.pop(code):
+            postings = self.postings[char]
+            del postings[code]
+            if not postings:
+                del self.postings[char]
+        del self.lengths[code]
@@ -0,0 +1,73 @@
+# utils/pagination.py
+
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+# ページの取得関数(先頭からの位置, 件数) -> (検索結果, 検索結果の総件数)。失敗した場合はNone
+# 総件数が応答に含まれない場合はNone
+PageFetcher = Callable[[int, int], Awaitable[Optional[tuple[list[dict[str, Any]], Optional[int]]]]]
+
+
+def split_pages(limit: int, page_size: int) -> list[tuple[int, int]]:
+    """
+    Split a result limit into pages no larger than the page size.
+
+    Args:
+        limit (int): Number of items to retrieve.
+        page_size (int): Maximum number of items per request.
+    Returns:
+        list: Offset from the first item (starting from 0) and number of items of each page.
+    """
+
+    page_size = max(page_size, 1)
+    return [(offset, min(page_size, limit - offset)) for offset in range(0, limit, page_size)]
+
+
+async def fetch_pages(limit: int, page_size: int, fetch: PageFetcher) -> Optional[list[dict[str, Any]]]:
+    """
+    Retrieve the first page, then the remaining pages that exist concurrently,
+    and merge them in page order, dropping items with a duplicate URL.
+
+    Args:
+        limit (int): Number of items to retrieve.
+        page_size (int): Maximum number of items per request.
+        fetch (Callable): Coroutine function that retrieves one page and the total number of results.
+    Returns:
+        list: Up to limit items. None if the first page failed.
+    """
+
+    pages = split_pages(limit, page_size)
+    if not pages:
+        return []
+
+    first_offset, first_size = pages[0]
+    first = await fetch(first_offset, first_size)
+    if first is None:
+        # 総件数が分からず、ストアも応答していないため残りのページは取得しない
+        return None
+
+    first_items, total = first
+    if len(first_items) < first_size:
+        # 1ページ目が要求した件数に満たない場合は次のページが存在しない
+        pages = []
+    elif total is not None:
+        # 総件数を超える位置のページは要求しない
+        pages = [(offset, min(size, total - offset)) for offset, size in pages[1:] if offset < total]
+    else:
+        pages = pages[1:]
+
+    results = await asyncio.gather(*[fetch(offset, size) for offset, size in pages])
+
+    # ページをまたいで同じ商品が返される場合があるため、URLで重複を除く
+    items: list[dict[str, Any]] = []
+    seen_urls: set[str] = set()
+    for page in [first_items] + [result[0] for result in results if result is not None]:
+        for item in page:
+            url = item.get("url")
+            if url:
+                if url in seen_urls:
+                    continue
+                seen_urls.add(url)
+            items.append(item)
+
+    return items[:limit]
@@ -0,0 +1,137 @@
+# utils/rate_limiter.py
+
+import asyncio
+import email.utils
+import os
+import time
+from typing import Optional
+
+from app.models.enums import Store
+
+# ストアごとの1秒あたりのリクエスト数とバースト数(0以下で無制限)
+RATE_LIMITS: dict[Store, tuple[float, int]] = {
+    Store.YAHOO: (float(os.getenv("YAHOO_RATE_LIMIT", "1.5")), int(os.getenv("YAHOO_RATE_BURST", "1"))),
+    Store.RAKUTEN: (float(os.getenv("RAKUTEN_RATE_LIMIT", "3.0")), int(os.getenv("RAKUTEN_RATE_BURST", "1"))),
+    Store.EBAY: (float(os.getenv("EBAY_RATE_LIMIT", "0")), int(os.getenv("EBAY_RATE_BURST", "1"))),
+}
+
+
+class TokenBucket:
+    """
+    A token bucket that paces requests to an upstream API.
+    When the upstream reports throttling, the rate is halved and then recovers gradually on success.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: Optional[float] = None) -> None:
+        """
+        Initialize the bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            burst (int): Maximum number of tokens that can be stored.
+            min_rate (float): Lower bound of the rate when slowed down. Defaults to a tenth of rate.
+        """
+
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Wait until a token is available and consume it.
+        Waiters are served in arrival order.
+        """
+
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+
+                await asyncio.sleep(wait)
+
+    def slow_down(self, retry_after: Optional[float] = None) -> None:
+        """
+        Reduce the rate after the upstream rejected a request.
+
+        Args:
+            retry_after (float): Seconds the upstream asked us to wait, if given.
+        """
+
+        self._refill(time.monotonic())
+        self.rate = max(self.rate / 2, self.min_rate)
+        self.tokens = 0.0
+        if retry_after is not None and retry_after > 0:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def speed_up(self) -> None:
+        """
+        Recover the rate step by step after a successful request.
+        """
+
+        if self.rate < self.max_rate:
+            self.rate = min(self.rate + self.max_rate / 10, self.max_rate)
+
+    def _refill(self, now: float) -> None:
+        """
+        Add the tokens accumulated since the last update.
+
+        Args:
+            now (float): Current monotonic time.
+        """
+
+        self.tokens = min(self.tokens + (now - self.updated_at) * self.rate, float(self.burst))
+        self.updated_at = now
+
+
+__limiters: dict[Store, Optional[TokenBucket]] = {}
+
+
+def get_rate_limiter(store: Store) -> Optional[TokenBucket]:
+    """
+    Get the rate limiter shared by every request to the store.
+
+    Args:
+        store (Store): Enumerated stores.
+    Returns:
+        TokenBucket: The store's limiter, or None if the store is not rate limited.
+    """
+
+    if store not in __limiters:
+        rate, burst = RATE_LIMITS.get(store, (0.0, 1))
+        __limiters[store] = TokenBucket(rate, burst) if rate > 0 else None
+    return __limiters[store]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Convert a Retry-After header value to seconds.
+
+    Args:
+        value (str): Header value in seconds or HTTP-date format.
+    Returns:
+        float: Seconds to wait, or None if the value cannot be parsed.
+    """
+
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
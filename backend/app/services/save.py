@@ -2,6 +2,7 @@
 
 import json
 import os
+from typing import Any, TextIO
 
 from app.models.product_data import ProductItem
 
@@ -15,12 +16,86 @@ def save_to_json(data: list[ProductItem], filename: str = "output.json") -> None
         filename (str): The file name in JSON format.
     """
 
+    with open(get_output_path(filename), "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def get_output_path(filename: str) -> str:
+    """
+    Get the full path of an output file.
+
+    Args:
+        filename (str): The file name. An absolute path is returned as it is.
+    Returns:
+        str: Path in the output directory.
+    """
+
     # パスを取得
     script_dir = os.path.dirname(os.path.abspath(__file__))
     # 出力先のディレクトリを指定
     output_dir = os.path.join(os.path.dirname(script_dir), "output")
     # 出力ファイル名のフルパスを作成
-    filepath = os.path.join(output_dir, filename)
+    return os.path.join(output_dir, filename)
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def open_jsonl(filepath: str) -> TextIO:
+    """
+    Open a JSONL file for appending records.
+
+    Args:
+        filepath (str): Path of the JSONL file.
+    Returns:
+        TextIO: File opened for appending.
+    """
+
+    incomplete = False
+    if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
+        with open(filepath, "rb") as existing:
+            existing.seek(-1, os.SEEK_END)
+            incomplete = existing.read(1) != b"\n"
+
+    f = open(filepath, "a", encoding="utf-8")
+    if incomplete:
+        # 中断により末尾が改行で終わっていない場合は、次の行と連結されないよう改行を補う
+        f.write("\n")
+    return f
+
+
+def append_to_jsonl(record: dict[str, Any], f: TextIO) -> None:
+    """
+    Append a record as one line of JSON and flush it, so that the completed records survive an interruption.
+
+    Args:
+        record (dict): Record to append.
+        f (TextIO): File opened for appending.
+    """
+
+    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    f.flush()
+
+
+def load_jsonl_values(filepath: str, key: str) -> set[Any]:
+    """
+    Read the values of a key from the records of a JSONL file.
+
+    Args:
+        filepath (str): Path of the JSONL file.
+        key (str): Key of the values to read.
+    Returns:
+        set: Values of the key. Empty if the file does not exist.
+    """
+
+    values: set[Any] = set()
+    if not os.path.exists(filepath):
+        return values
+
+    with open(filepath, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 中断により書きかけになった行は無視する
+                continue
+            if isinstance(record, dict) and key in record:
+                values.add(record[key])
+    return values
@@ -0,0 +1,112 @@
+# utils/similarity_matrix.py
+
+import numpy as np
+
+NGRAM_SIZE = 2
+
+
+def match_names(
+    item_names: list[str], translated_names: list[str], group_names: list[str], threshold: float
+) -> list[int]:
+    """
+    Assign items to groups using a cosine similarity matrix of character n-gram vectors.
+    All similarities are computed in a few array operations instead of one comparison per pair.
+
+    Columns are numbered with the existing groups first and then the items themselves,
+    so an assignment of len(group_names) + k means the group created by item k.
+
+    Args:
+        item_names (list): Normalized product names of the items.
+        translated_names (list): Normalized translated product names of the items.
+        group_names (list): Normalized names of the existing groups.
+        threshold (float): Cosine similarity at which an item joins a group.
+    Returns:
+        list: Column index assigned to each item.
+    """
+
+    vocabulary: dict[str, int] = {}
+    item_vectors = _vectorize(item_names, vocabulary)
+    translated_vectors = _vectorize(translated_names, vocabulary)
+    group_vectors = _vectorize(group_names, vocabulary)
+    size = len(vocabulary)
+    item_vectors, translated_vectors, group_vectors = (
+        _pad(item_vectors, size),
+        _pad(translated_vectors, size),
+        _pad(group_vectors, size),
+    )
+
+    # 既存グループとの類似度と、同じバッチ内で新規作成されるグループとの類似度
+    group_scores = np.maximum(item_vectors @ group_vectors.T, translated_vectors @ group_vectors.T)
+    item_scores = np.maximum(item_vectors @ item_vectors.T, translated_vectors @ item_vectors.T)
+
+    group_count = len(group_names)
+    creators = np.zeros(len(item_names), dtype=bool)
+    assignments: list[int] = []
+    for i in range(len(item_names)):
+        hits = np.flatnonzero(group_scores[i] >= threshold)
+        if hits.size:
+            assignments.append(int(hits[0]))
+            continue
+
+        hits = np.flatnonzero((item_scores[i, :i] >= threshold) & creators[:i])
+        if hits.size:
+            assignments.append(group_count + int(hits[0]))
+        else:
+            creators[i] = True
+            assignments.append(group_count + i)
+
+    return assignments
+
+
+def _vectorize(names: list[str], vocabulary: dict[str, int]) -> np.ndarray:
+    """
+    Convert names into L2-normalized character n-gram count vectors.
+    New n-grams are added to the vocabulary.
+
+    Args:
+        names (list): Normalized names.
+        vocabulary (dict): Column index of each n-gram.
+    Returns:
+        np.ndarray: Matrix with one row per name.
+    """
+
+    rows: list[int] = []
+    columns: list[int] = []
+    for row, name in enumerate(names):
+        for gram in _ngrams(name):
+            rows.append(row)
+            columns.append(vocabulary.setdefault(gram, len(vocabulary)))
+
+    vectors = np.zeros((len(names), len(vocabulary)), dtype=np.float64)
+    np.add.at(vectors, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), 1.0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def _pad(vectors: np.ndarray, size: int) -> np.ndarray:
+    """
+    Extend the vectors with zero columns up to the vocabulary size.
+
+    Args:
+        vectors (np.ndarray): Vectors built with a smaller vocabulary.
+        size (int): Final vocabulary size.
+    Returns:
+        np.ndarray: Vectors with size columns.
+    """
+
+    return np.pad(vectors, ((0, 0), (0, size - vectors.shape[1])))
+
+
+def _ngrams(name: str) -> list[str]:
+    """
+    Split a name into character n-grams. Names shorter than the n-gram size are used as is.
+
+    Args:
+        name (str): Normalized name.
+    Returns:
+        list: Character n-grams.
+    """
+
+    if len(name) < NGRAM_SIZE:
+        return [name] if name else []
+    return [name[i : i + NGRAM_SIZE] for i in range(len(name) - NGRAM_SIZE + 1)]
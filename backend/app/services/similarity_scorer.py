@@ -0,0 +1,114 @@
+# utils/similarity_scorer.py
+
+import difflib
+from typing import Optional
+
+
+class PruningStats:
+    """
+    Counters of how similarity checks were decided, for benchmarking the pruning cascade.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the counters.
+        """
+
+        self.compared = 0
+        self.real_quick_pruned = 0
+        self.quick_pruned = 0
+        self.full_ratio = 0
+
+    def pruning_rate(self) -> float:
+        """
+        Get the ratio of comparisons rejected before computing the full ratio.
+
+        Returns:
+            float: Pruned comparisons divided by all comparisons.
+        """
+
+        if self.compared == 0:
+            return 0.0
+        return (self.compared - self.full_ratio) / self.compared
+
+    def to_dict(self) -> dict[str, float]:
+        """
+        Get the counters.
+
+        Returns:
+            dict: Number of comparisons decided at each stage and the pruning rate.
+        """
+
+        return {
+            "compared": self.compared,
+            "real_quick_pruned": self.real_quick_pruned,
+            "quick_pruned": self.quick_pruned,
+            "full_ratio": self.full_ratio,
+            "pruning_rate": self.pruning_rate(),
+        }
+
+    def reset(self) -> None:
+        """
+        Reset all counters to zero.
+        """
+
+        self.compared = 0
+        self.real_quick_pruned = 0
+        self.quick_pruned = 0
+        self.full_ratio = 0
+
+
+class SimilarityScorer:
+    """
+    Check difflib similarity against a threshold, rejecting pairs by cheap upper bounds first.
+    The result is identical to difflib.SequenceMatcher(None, a, b).ratio() >= threshold.
+    """
+
+    def __init__(self, threshold: float, stats: Optional[PruningStats] = None) -> None:
+        """
+        Initialize the scorer.
+
+        Args:
+            threshold (float): Similarity threshold.
+            stats (PruningStats): Counters to update. A new one is created if omitted.
+        """
+
+        self.threshold = threshold
+        self.stats = stats if stats is not None else PruningStats()
+
+    def matcher(self, text: str) -> difflib.SequenceMatcher:
+        """
+        Create a matcher for a compared text. The analysis of the text (seq2) is done once and reused.
+
+        Args:
+            text (str): Normalized text to compare against groups.
+        Returns:
+            difflib.SequenceMatcher: Matcher with text set as seq2.
+        """
+
+        return difflib.SequenceMatcher(None, "", text)
+
+    def is_similar(self, org_text: str, matcher: difflib.SequenceMatcher) -> bool:
+        """
+        Check if the texts reach the threshold.
+
+        Args:
+            org_text (str): Normalized name of the group (seq1).
+            matcher (difflib.SequenceMatcher): Matcher created by matcher().
+        Returns:
+            bool: True if the ratio is greater than or equal to the threshold.
+        """
+
+        self.stats.compared += 1
+
+        matcher.set_seq1(org_text)
+        # 長さの差だけで閾値に届かない組み合わせを除外する
+        if matcher.real_quick_ratio() < self.threshold:
+            self.stats.real_quick_pruned += 1
+            return False
+        if matcher.quick_ratio() < self.threshold:
+            self.stats.quick_pruned += 1
+            return False
+
+        self.stats.full_ratio += 1
+        return matcher.ratio() >= self.threshold
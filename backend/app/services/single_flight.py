@@ -0,0 +1,88 @@
+# utils/single_flight.py
+
+import asyncio
+from typing import Any, Callable, Coroutine, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one in-flight call.
+    Callers that arrive while the call is running await its result instead of starting their own.
+    The call is cancelled when every caller waiting for it is cancelled.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the group.
+        """
+
+        self.calls: dict[Hashable, asyncio.Task] = {}
+        # 呼び出しごとに、結果を待っている呼び出し元の数
+        self.waiters: dict[asyncio.Task, int] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, call: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        """
+        Run the call unless an identical one is in flight, and return its result.
+
+        Args:
+            key (Hashable): Key identifying identical calls.
+            call (Callable): Coroutine function to run.
+        Returns:
+            T: Result of the shared call. Its exception is raised to every caller.
+        """
+
+        task = self.calls.get(key)
+        if task is None:
+            self.executed += 1
+            task = asyncio.create_task(call())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+
+        self.waiters[task] = self.waiters.get(task, 0) + 1
+        try:
+            # 一人の呼び出し元がキャンセルされても、共有している呼び出しは止めない
+            return await asyncio.shield(task)
+        finally:
+            self.waiters[task] -= 1
+            if self.waiters[task] == 0:
+                del self.waiters[task]
+                if not task.done():
+                    # 待っている呼び出し元がいなくなった呼び出しは取り消し、以降の呼び出しは新しく実行する
+                    if self.calls.get(key) is task:
+                        del self.calls[key]
+                    task.cancel()
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        """
+        Forget a finished call so that the next call with the key runs again.
+
+        Args:
+            key (Hashable): Key of the call.
+            task (asyncio.Task): The finished call.
+        """
+
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            # 呼び出し元が全員キャンセルされていても例外を回収しておく
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get the call counters.
+
+        Returns:
+            dict: Number of executed calls, coalesced calls and calls in flight.
+        """
+
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.calls),
+        }
@@ -0,0 +1,81 @@
+# utils/token_manager.py
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TokenManager:
+    """
+    Cache an access token until shortly before it expires.
+    Tokens close to expiry are refreshed in the background, and concurrent callers share one refresh.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[tuple[str, float]]], refresh_margin: float = 300.0) -> None:
+        """
+        Initialize the manager.
+
+        Args:
+            fetch (Callable): Coroutine function that returns a new token and its lifetime in seconds.
+            refresh_margin (float): Seconds before expiry at which the token is refreshed.
+        """
+
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.token = ""
+        self.expires_at = 0.0
+        self.refresh_task: Optional[asyncio.Task] = None
+
+    async def get(self) -> str:
+        """
+        Get a valid token.
+
+        Returns:
+            str: Access token. Empty if no token could be retrieved.
+        """
+
+        now = time.monotonic()
+        if self.token and now < self.expires_at - self.refresh_margin:
+            return self.token
+
+        if self.token and now < self.expires_at:
+            # 期限が近いだけならバックグラウンドで更新し、今のトークンを返す
+            self._start_refresh()
+            return self.token
+
+        return await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self) -> asyncio.Task:
+        """
+        Start a refresh unless one is already in flight.
+
+        Returns:
+            asyncio.Task: The in-flight refresh.
+        """
+
+        if self.refresh_task is None or self.refresh_task.done():
+            self.refresh_task = asyncio.create_task(self._refresh())
+        return self.refresh_task
+
+    async def _refresh(self) -> str:
+        """
+        Fetch a new token and cache it. The current token is kept if the fetch fails.
+
+        Returns:
+            str: The cached token after the refresh.
+        """
+
+        try:
+            token, expires_in = await self.fetch()
+        except Exception as e:
+            logger.warning(f"Failed to refresh token: {e}")
+            return self.token if time.monotonic() < self.expires_at else ""
+
+        if token:
+            self.token = token
+            self.expires_at = time.monotonic() + expires_in
+        return self.token if time.monotonic() < self.expires_at else ""
@@ -0,0 +1,166 @@
+# utils/translation_cache.py
+
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+class TranslationCache:
+    """
+    A two-tier cache of translation results.
+    Recently used entries are kept in memory, and all entries are persisted to a local SQLite file.
+    The file is read and written in a worker thread so that the event loop is not blocked.
+    """
+
+    def __init__(self, path: Optional[str] = None, maxsize: int = 10000) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            path (str): SQLite file path. The disk tier is disabled if empty.
+            maxsize (int): Maximum number of entries kept in memory.
+        """
+
+        self.maxsize = maxsize
+        self.memory: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self.lock = threading.Lock()
+        # SQLiteの接続は複数のスレッドから同時に使えないため、別のロックで直列化する
+        self.db_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.connection: Optional[sqlite3.Connection] = None
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "text TEXT NOT NULL, dest TEXT NOT NULL, translated TEXT NOT NULL, PRIMARY KEY (text, dest))"
+            )
+            self.connection.commit()
+
+    async def get(self, text: str, dest: str) -> Optional[str]:
+        """
+        Get a cached translation.
+
+        Args:
+            text (str): Original string.
+            dest (str): Target language.
+        Returns:
+            str: The translated string, or None if not cached.
+        """
+
+        key = (text, dest)
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key]
+
+        translated: Optional[str] = None
+        if self.connection is not None:
+            translated = await asyncio.to_thread(self._read, self.connection, key)
+
+        with self.lock:
+            if translated is None:
+                self.misses += 1
+                return None
+
+            self._remember(key, translated)
+            self.disk_hits += 1
+            return translated
+
+    async def set(self, text: str, dest: str, translated: str) -> None:
+        """
+        Store a translation.
+
+        Args:
+            text (str): Original string.
+            dest (str): Target language.
+            translated (str): The translated string.
+        """
+
+        key = (text, dest)
+        with self.lock:
+            self._remember(key, translated)
+        if self.connection is not None:
+            await asyncio.to_thread(self._write, self.connection, key, translated)
+
+    def clear(self) -> None:
+        """
+        Remove all entries from memory and reset the counters. The disk tier is kept.
+        """
+
+        with self.lock:
+            self.memory.clear()
+            self.hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: Number of memory hits, disk hits, misses and entries in memory.
+        """
+
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "size": len(self.memory),
+            }
+
+    def _remember(self, key: tuple[str, str], translated: str) -> None:
+        """
+        Put an entry in memory, evicting the least recently used one if full.
+
+        Args:
+            key (tuple): Original string and target language.
+            translated (str): The translated string.
+        """
+
+        self.memory[key] = translated
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def _read(self, connection: sqlite3.Connection, key: tuple[str, str]) -> Optional[str]:
+        """
+        Read an entry from the disk tier.
+
+        Args:
+            connection (Connection): SQLite connection of the disk tier.
+            key (tuple): Original string and target language.
+        Returns:
+            str: The translated string, or None if not stored.
+        """
+
+        with self.db_lock:
+            row = connection.execute(
+                "SELECT translated FROM translations WHERE text = ? AND dest = ?", key
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _write(self, connection: sqlite3.Connection, key: tuple[str, str], translated: str) -> None:
+        """
+        Write an entry to the disk tier.
+
+        Args:
+            connection (Connection): SQLite connection of the disk tier.
+            key (tuple): Original string and target language.
+            translated (str): The translated string.
+        """
+
+        with self.db_lock:
+            connection.execute(
+                "INSERT OR REPLACE INTO translations (text, dest, translated) VALUES (?, ?, ?)",
+                (*key, translated),
+            )
+            connection.commit()
@@ -1,8 +1,30 @@
 # utils/translator.py
 
+import asyncio
+import os
+import re
+from typing import Optional
+
+from app.services.translation_cache import TranslationCache
 from googletrans import Translator
 
+# 翻訳結果のキャッシュ(パスを空にするとディスクへの保存を行わない)
+TRANSLATION_CACHE_PATH = os.getenv(
+    "TRANSLATION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "translation.sqlite3"),
+)
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "10000"))
+# まとめて翻訳する際に同時に実行する翻訳の上限
+TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "5"))
+
+# ひらがな・カタカナ・CJK統合漢字・全角形(半角カナを含む)・和文の句読点
+JAPANESE_PATTERN = re.compile(
+    r"[\u3000-\u303f\u3040-\u309f\u30a0-\u30ff\u31f0-\u31ff\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]"
+)
+LATIN_PATTERN = re.compile(r"[A-Za-z]")
+
 __translator = Translator()
+cache: TranslationCache = TranslationCache(TRANSLATION_CACHE_PATH, TRANSLATION_CACHE_SIZE)
 
 
 async def translate(text: str) -> dict[str, str]:
@@ -26,6 +48,76 @@ async def translate(text: str) -> dict[str, str]:
     return translate
 
 
+class LazyTranslation:
+    """
+    The English and Japanese forms of a text, translated only when first requested.
+    Each form is computed once and shared by all callers.
+    """
+
+    def __init__(self, text: str) -> None:
+        """
+        Initialize the translation without translating anything.
+
+        Args:
+            text (str): Original string.
+        """
+
+        self.text = text
+        self.tasks: dict[str, asyncio.Task] = {}
+
+    async def en(self) -> str:
+        """
+        Get the English form of the text.
+
+        Returns:
+            str: The original string if it is English, otherwise the translated string.
+        """
+
+        return await self._get("en")
+
+    async def ja(self) -> str:
+        """
+        Get the Japanese form of the text.
+
+        Returns:
+            str: The original string if it is not English, otherwise the translated string.
+        """
+
+        return await self._get("ja")
+
+    async def _get(self, dest: str) -> str:
+        """
+        Start the translation into the language on first use and wait for it.
+
+        Args:
+            dest (str): Target language.
+        Returns:
+            str: The string in the language.
+        """
+
+        task = self.tasks.get(dest)
+        if task is None:
+            task = asyncio.create_task(self._translate(dest))
+            self.tasks[dest] = task
+        return await asyncio.shield(task)
+
+    async def _translate(self, dest: str) -> str:
+        """
+        Translate the text into the language unless it is already written in it.
+
+        Args:
+            dest (str): Target language.
+        Returns:
+            str: The string in the language.
+        """
+
+        if (await is_english(self.text)) == (dest == "en"):
+            return self.text
+        if dest == "en":
+            return await translate_to_english(self.text)
+        return await translate_to_japanese(self.text)
+
+
 async def is_english(text: str) -> bool:
     """
     Checks whether text is English.
@@ -36,8 +128,33 @@ async def is_english(text: str) -> bool:
         bool: True if English, False if not.
     """
 
-    detection = await __translator.detect(text)
-    return detection.lang == "en"
+    lang = detect_language(text)
+    if lang is None:
+        # 文字種で判定できない場合のみネットワーク経由で判定する
+        lang = await cache.get(text, "detect")
+    if lang is None:
+        detection = await __translator.detect(text)
+        lang = detection.lang
+        await cache.set(text, "detect", str(lang))
+    return lang == "en"
+
+
+def detect_language(text: str) -> Optional[str]:
+    """
+    Detect whether text is Japanese or English from the Unicode scripts it contains.
+
+    Args:
+        text (str): The string to check.
+    Returns:
+        str: "ja" if it contains Japanese characters, "en" if it is ASCII with Latin letters,
+            None if it cannot be decided locally.
+    """
+
+    if JAPANESE_PATTERN.search(text):
+        return "ja"
+    if text.isascii() and LATIN_PATTERN.search(text):
+        return "en"
+    return None
 
 
 async def translate_to_japanese(text: str) -> str:
@@ -50,8 +167,7 @@ async def translate_to_japanese(text: str) -> str:
         str: The translated string.
     """
 
-    translation = await __translator.translate(text, dest="ja")
-    return translation.text
+    return await __translate(text, "ja")
 
 
 async def translate_to_english(text: str) -> str:
@@ -64,5 +180,46 @@ async def translate_to_english(text: str) -> str:
         str: The translated string.
     """
 
-    translation = await __translator.translate(text, dest="en")
-    return translation.text
+    return await __translate(text, "en")
+
+
+async def translate_all_to_japanese(texts: list[str], concurrency: int = TRANSLATION_CONCURRENCY) -> dict[str, str]:
+    """
+    Translate multiple texts into Japanese concurrently.
+    Duplicate texts are translated only once.
+
+    Args:
+        texts (list): The strings to translate.
+        concurrency (int): Maximum number of translations running at the same time.
+    Returns:
+        dict: Translated strings keyed by the original strings.
+    """
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(text: str) -> str:
+        async with semaphore:
+            return await __translate(text, "ja")
+
+    unique_texts: list[str] = list(dict.fromkeys(texts))
+    translated: list[str] = await asyncio.gather(*[run(text) for text in unique_texts])
+    return dict(zip(unique_texts, translated))
+
+
+async def __translate(text: str, dest: str) -> str:
+    """
+    Translate text, reusing cached results.
+
+    Args:
+        text (str): The string to translate.
+        dest (str): Target language.
+    Returns:
+        str: The translated string.
+    """
+
+    translated = await cache.get(text, dest)
+    if translated is None:
+        translation = await __translator.translate(text, dest=dest)
+        translated = translation.text
+        await cache.set(text, dest, translated)
+    return translated
@@ -0,0 +1,4 @@
+import os
+
+# テスト中は翻訳キャッシュをディスクに保存しない
+os.environ.setdefault("TRANSLATION_CACHE_PATH", "")
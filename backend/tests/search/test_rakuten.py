@@ -186,3 +186,34 @@ async def test_search_rakuten_items_raise_exception(mock_get_requests: AsyncMock
     assert isinstance(results, list)
     assert len(results) == 0
     assert mock_get_requests.called
+
+
+@pytest.mark.asyncio
+async def test_search_rakuten_items_pages() -> None:
+    async def get_requests(url: str, params: dict, store: object) -> dict:
+        page = params.get("page", 1)
+        # 2ページ目の先頭は1ページ目の末尾と同じ商品
+        return {
+            "Items": [
+                {
+                    "itemName": f"商品{page}-{i}",
+                    "itemPrice": 100,
+                    "itemUrl": f"https://example.com/{(page - 1) * 30 + i - (1 if page == 2 and i == 0 else 0)}",
+                    "mediumImageUrls": [],
+                    "itemCaption": "",
+                }
+                for i in range(params["hits"])
+            ]
+        }
+
+    option = {"search_type": SearchType.JAN_CODE, "search_result_limit": 65}
+    with patch("app.search.rakuten.get_requests", side_effect=get_requests) as mock_get_requests:
+        results = await rakuten.search_rakuten_items(["4902370550733"], option)
+
+    pages = sorted(call.kwargs["params"].get("page", 1) for call in mock_get_requests.call_args_list)
+    assert pages == [1, 2, 3]
+    assert all(call.kwargs["params"]["hits"] == 30 for call in mock_get_requests.call_args_list)
+    assert len(results) == 65
+    assert len({item["url"] for item in results}) == 65
+    assert results[29]["product_name"] == "商品1-29"
+    assert results[30]["product_name"] == "商品2-1"
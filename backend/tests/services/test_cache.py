@@ -0,0 +1,76 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from app.services.cache import StaleWhileRevalidateCache, TTLCache
+
+
+def test_ttl_cache_expires() -> None:
+    cache: TTLCache[str] = TTLCache(ttl=10, stale_ttl=20)
+    with patch("app.services.cache.time.monotonic", return_value=100.0):
+        cache.set("key", "value")
+    with patch("app.services.cache.time.monotonic", return_value=105.0):
+        assert cache.get("key") == ("value", True)
+    with patch("app.services.cache.time.monotonic", return_value=115.0):
+        assert cache.get("key") == ("value", False)
+    with patch("app.services.cache.time.monotonic", return_value=131.0):
+        assert cache.get("key") == (None, False)
+
+    assert cache.stats() == {"hits": 1, "stale_hits": 1, "misses": 1, "evictions": 0, "entries": 0, "bytes": 0}
+
+
+def test_ttl_cache_bounds() -> None:
+    cache: TTLCache[str] = TTLCache(ttl=10, max_entries=2, max_bytes=10, sizeof=len)
+    cache.set("a", "1234")
+    cache.set("b", "1234")
+    cache.get("a")
+    cache.set("c", "12")
+
+    # サイズ上限を超えたため最も使われていない"b"が削除される
+    assert cache.get("b") == (None, False)
+    assert cache.get("a") == ("1234", True)
+    assert cache.stats()["bytes"] == 6
+
+    cache.set("d", "12345678901")
+    assert cache.get("d") == (None, False)
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate() -> None:
+    cache: StaleWhileRevalidateCache[list[int]] = StaleWhileRevalidateCache(TTLCache(ttl=0, stale_ttl=60))
+    compute = AsyncMock(side_effect=[[1], [2]])
+
+    assert await cache.get_or_compute("key", compute) == [1]
+    # 期限切れの値を返しつつ裏で更新する
+    assert await cache.get_or_compute("key", compute) == [1]
+    await asyncio.gather(*cache.refreshing.values())
+
+    cache.cache.ttl = 60
+    assert await cache.get_or_compute("key", compute) == [2]
+    assert compute.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate_keeps_stale_on_failure() -> None:
+    cache: StaleWhileRevalidateCache[list[int]] = StaleWhileRevalidateCache(TTLCache(ttl=0, stale_ttl=60))
+    compute = AsyncMock(side_effect=[[1], Exception("error"), []])
+
+    assert await cache.get_or_compute("key", compute) == [1]
+    for _ in range(2):
+        assert await cache.get_or_compute("key", compute) == [1]
+        await asyncio.gather(*cache.refreshing.values())
+
+    assert cache.stats()["refresh_failures"] == 2
+    assert cache.cache.get("key") == ([1], False)
+
+
+@pytest.mark.asyncio
+async def test_get_or_compute_does_not_store_empty_value() -> None:
+    cache: StaleWhileRevalidateCache[list[int]] = StaleWhileRevalidateCache(TTLCache(ttl=60))
+    compute = AsyncMock(side_effect=[[], [1]])
+
+    assert await cache.get_or_compute("key", compute) == []
+    # 空の結果はキャッシュされないため、次の呼び出しで再計算する
+    assert await cache.get_or_compute("key", compute) == [1]
+    assert await cache.get_or_compute("key", compute) == [1]
+    assert compute.await_count == 2
@@ -0,0 +1,116 @@
+from unittest.mock import patch
+
+from app.models.enums import Store
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker, is_failure
+
+
+def record(breaker: CircuitBreaker, failed: bool) -> None:
+    generation = breaker.allow()
+    assert generation is not None
+    breaker.record(generation, failed)
+
+
+def test_opens_on_failure_rate() -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=4, window=30, open_seconds=10)
+
+    for failed in [False, True, False]:
+        record(breaker, failed)
+    # 最低リクエスト数に達するまでは判定しない
+    assert breaker.state == circuit_breaker.CLOSED
+
+    record(breaker, True)
+
+    assert breaker.state == circuit_breaker.OPEN
+    assert breaker.is_open()
+    assert breaker.allow() is None
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_ignores_outcomes_outside_window() -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=2, window=30)
+
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=0.0):
+        record(breaker, True)
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=100.0):
+        record(breaker, False)
+        record(breaker, False)
+
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.stats()["requests"] == 2
+
+
+def test_half_open_probes_close_circuit() -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=1, open_seconds=10, half_open_requests=2)
+
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=0.0):
+        record(breaker, True)
+        assert breaker.allow() is None
+
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=10.0):
+        # 試行は指定数までしか通さない
+        first = breaker.allow()
+        second = breaker.allow()
+        assert first is not None and second is not None
+        assert breaker.allow() is None
+        assert breaker.is_open()
+
+        # 中断された試行の枠は戻す
+        breaker.record(first, None)
+        third = breaker.allow()
+        assert third is not None
+
+        breaker.record(second, False)
+        assert breaker.state == circuit_breaker.HALF_OPEN
+        breaker.record(third, False)
+
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.allow() is not None
+
+
+def test_failed_probe_reopens_circuit() -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=1, open_seconds=10)
+
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=0.0):
+        record(breaker, True)
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=10.0):
+        record(breaker, True)
+
+        assert breaker.state == circuit_breaker.OPEN
+        assert breaker.allow() is None
+
+
+def test_half_open_ignores_requests_allowed_before_opening() -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=1, open_seconds=10)
+
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=0.0):
+        late = breaker.allow()
+        assert late is not None
+        record(breaker, True)
+    with patch("app.services.circuit_breaker.time.monotonic", return_value=10.0):
+        probe = breaker.allow()
+        assert probe is not None
+
+        # 遮断前に送られたリクエストの結果では閉じたり再び遮断したりしない
+        breaker.record(late, False)
+        assert breaker.state == circuit_breaker.HALF_OPEN
+        breaker.record(late, True)
+        assert breaker.state == circuit_breaker.HALF_OPEN
+
+        breaker.record(probe, False)
+        assert breaker.state == circuit_breaker.CLOSED
+
+
+def test_get_circuit_breaker_is_shared_per_store() -> None:
+    breaker = circuit_breaker.get_circuit_breaker(Store.YAHOO)
+
+    assert breaker is not None
+    assert circuit_breaker.get_circuit_breaker(Store.YAHOO) is breaker
+    assert circuit_breaker.get_circuit_breaker(Store.RAKUTEN) is not breaker
+
+
+def test_is_failure() -> None:
+    assert is_failure(429)
+    assert is_failure(503)
+    assert not is_failure(200)
+    assert not is_failure(404)
@@ -47,3 +47,17 @@ def test_find_jan_code_13_digits_partially_ok() -> None:
 
     jan_codes = ["0000000000001", "4902370550733"]
     assert code_finder.find_jan_code(jan_codes) == jan_codes[1]
+
+
+def test_parse_jan_codes() -> None:
+    assert code_finder.parse_jan_codes("4902370550733") == ["4902370550733"]
+    # 全角数字と区切り文字
+    assert code_finder.parse_jan_codes("４９０２３７０５５０７３３") == ["4902370550733"]
+    assert code_finder.parse_jan_codes(" 49012347, 4902370550733 49012347") == ["49012347", "4902370550733"]
+
+
+def test_parse_jan_codes_not_jan() -> None:
+    assert code_finder.parse_jan_codes("4902370550734") == []
+    assert code_finder.parse_jan_codes("iPhone 4902370550733") == []
+    assert code_finder.parse_jan_codes("123456789") == []
+    assert code_finder.parse_jan_codes("") == []
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+from app.services.fan_out import fan_out
+
+
+@pytest.mark.asyncio
+async def test_fan_out_keeps_keyword_order() -> None:
+    async def search(keyword: str) -> list[dict]:
+        # 後のキーワードほど先に完了させる
+        await asyncio.sleep(0.03 / int(keyword))
+        return [{"jan_code": keyword}]
+
+    results = await fan_out(["1", "2", "3"], search)
+
+    assert [item["jan_code"] for item in results] == ["1", "2", "3"]
+
+
+@pytest.mark.asyncio
+async def test_fan_out_runs_concurrently() -> None:
+    async def search(keyword: str) -> list[dict]:
+        await asyncio.sleep(0.05)
+        return [{"jan_code": keyword}, {"jan_code": keyword}]
+
+    started = time.monotonic()
+    results = await fan_out([str(i) for i in range(10)], search, concurrency=10)
+
+    assert len(results) == 20
+    assert time.monotonic() - started < 0.2
+
+
+@pytest.mark.asyncio
+async def test_fan_out_limits_concurrency() -> None:
+    running = 0
+    max_running = 0
+
+    async def search(keyword: str) -> list[dict]:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return []
+
+    results = await fan_out([str(i) for i in range(10)], search, concurrency=3)
+
+    assert results == []
+    assert max_running == 3
+
+
+@pytest.mark.asyncio
+async def test_fan_out_calls_on_batch() -> None:
+    batches: list[tuple[int, str, list[dict]]] = []
+
+    async def search(keyword: str) -> list[dict]:
+        return [{"jan_code": keyword}]
+
+    async def on_batch(seq: int, keyword: str, items: list[dict]) -> None:
+        batches.append((seq, keyword, items))
+
+    await fan_out(["a", "b"], search, on_batch=on_batch)
+
+    assert sorted(batches) == [(0, "a", [{"jan_code": "a"}]), (1, "b", [{"jan_code": "b"}])]
+
+
+@pytest.mark.asyncio
+async def test_fan_out_skips_failed_searches() -> None:
+    batches = []
+
+    async def search(keyword: str) -> list[dict] | None:
+        return None if keyword == "2" else [{"jan_code": keyword}]
+
+    async def on_batch(index: int, keyword: str, items: list[dict]) -> None:
+        batches.append(index)
+
+    results = await fan_out(["1", "2", "3"], search, on_batch=on_batch)
+
+    assert [item["jan_code"] for item in results] == ["1", "3"]
+    assert sorted(batches) == [0, 2]
+
+
+@pytest.mark.asyncio
+async def test_fan_out_cancels_searches_when_cancelled() -> None:
+    cancelled: list[str] = []
+
+    async def search(keyword: str) -> list[dict]:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(keyword)
+            raise
+        return []
+
+    task = asyncio.create_task(fan_out(["a", "b"], search))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert sorted(cancelled) == ["a", "b"]
@@ -1,5 +1,7 @@
+from unittest.mock import AsyncMock, patch
+
 import pytest
-from app.models.enums import SearchType
+from app.models.enums import SearchType, SimilarityEngine, Store
 from app.services import formatter
 
 
@@ -218,3 +220,144 @@ async def test_format_with_product_name() -> None:
     assert item["image_url"]["yahoo"] == None
     assert item["image_url"]["rakuten"] == None
     assert item["image_url"]["ebay"] == "https://image.com/9.jpg"
+
+
+@pytest.mark.asyncio
+@patch("app.services.formatter.translate_all_to_japanese", new_callable=AsyncMock)
+async def test_format_with_product_name_vector(mock_translate: AsyncMock) -> None:
+    mock_translate.return_value = {"Product A-1": "商品A-1", "other": "その他"}
+    yahoo_items = [
+        {
+            "jan_code": "",
+            "product_name": "商品A-1",
+            "price": 800,
+            "url": "https://store.shopping.yahoo.co.jp/a",
+            "image_url": "https://image.com/1.jpg",
+        },
+    ]
+    rakuten_items = [
+        {
+            "jan_code": "",
+            "product_name": "商品A-1 送料無料",
+            "price": 900,
+            "url": "https://rakuten.com/a",
+            "image_url": "https://image.com/2.jpg",
+        },
+    ]
+    ebay_items = [
+        {
+            "jan_code": "",
+            "product_name": "Product A-1",
+            "price": 12.12,
+            "url": "https://ebay.com/a",
+            "image_url": "https://image.com/3.jpg",
+        },
+        {
+            "jan_code": "",
+            "product_name": "other",
+            "price": 14.14,
+            "url": "https://ebay.com/b",
+            "image_url": "https://image.com/4.jpg",
+        },
+    ]
+    option = {
+        "search_type": SearchType.KEYWORD,
+        "similarity_threshold": 0.45,
+        "similarity_engine": SimilarityEngine.VECTOR,
+    }
+
+    result = await formatter.format(yahoo_items, rakuten_items, ebay_items, option)
+
+    assert len(result) == 2
+    assert result[0]["product_name"] == {"yahoo": "商品A-1", "rakuten": "商品A-1 送料無料", "ebay": "Product A-1"}
+    assert result[1]["product_name"] == {"yahoo": None, "rakuten": None, "ebay": "other"}
+    mock_translate.assert_called_once_with(["Product A-1", "other"])
+
+
+@pytest.mark.asyncio
+async def test_aggregator_result_does_not_depend_on_arrival_order() -> None:
+    batches = [
+        (Store.YAHOO, 0, [{"jan_code": "2", "product_name": "Y2", "price": 500, "url": "y2", "image_url": ""}]),
+        (Store.YAHOO, 1, [{"jan_code": "1", "product_name": "Y1", "price": 300, "url": "y1", "image_url": ""}]),
+        (Store.RAKUTEN, 0, [{"jan_code": "3", "product_name": "R3", "price": 100, "url": "r3", "image_url": ""}]),
+        (Store.RAKUTEN, 1, [{"jan_code": "1", "product_name": "R1-a", "price": 200, "url": "r1a", "image_url": ""}]),
+        (Store.RAKUTEN, 2, [{"jan_code": "1", "product_name": "R1-b", "price": 200, "url": "r1b", "image_url": ""}]),
+    ]
+    option = {"search_type": SearchType.JAN_CODE}
+
+    expected = None
+    for order in ([0, 1, 2, 3, 4], [4, 3, 2, 1, 0], [2, 4, 0, 3, 1]):
+        aggregator = formatter.ProductAggregator(option)
+        for i in order:
+            store, seq, items = batches[i]
+            await aggregator.add(store, items, seq)
+        result = aggregator.result()
+
+        if expected is None:
+            expected = result
+        assert result == expected
+
+    assert expected is not None
+    assert [item["jan_code"] for item in expected] == ["2", "1", "3"]
+    assert expected[1]["product_name"]["rakuten"] == "R1-a"
+    assert expected[1]["price"]["rakuten"] == {"min": 200, "max": 200, "target": 200}
+
+
+@pytest.mark.asyncio
+async def test_aggregator_groups_product_name_in_store_order() -> None:
+    yahoo_items = [{"jan_code": "", "product_name": "商品A", "price": 800, "url": "y", "image_url": ""}]
+    rakuten_items = [{"jan_code": "", "product_name": "商品A-1", "price": 900, "url": "r", "image_url": ""}]
+    option = {"search_type": SearchType.KEYWORD, "similarity_threshold": 0.45}
+
+    aggregator = formatter.ProductAggregator(option)
+    await aggregator.add(Store.RAKUTEN, rakuten_items)
+    aggregator.complete(Store.RAKUTEN)
+    # Yahooの結果が届くまでは楽天の結果をグルーピングしない
+    assert aggregator.result() == []
+
+    await aggregator.add(Store.YAHOO, yahoo_items)
+    aggregator.complete(Store.YAHOO)
+    result = aggregator.result()
+
+    assert len(result) == 1
+    assert result[0]["product_name"] == {"yahoo": "商品A", "rakuten": "商品A-1", "ebay": None}
+
+
+@pytest.mark.asyncio
+async def test_aggregator_drain_changes() -> None:
+    option = {"search_type": SearchType.JAN_CODE}
+    aggregator = formatter.ProductAggregator(option)
+
+    await aggregator.add(
+        Store.YAHOO, [{"jan_code": "1", "product_name": "Y1", "price": 100, "url": "", "image_url": ""}]
+    )
+    await aggregator.add(Store.EBAY, [{"jan_code": "2", "product_name": "E2", "price": 1, "url": "", "image_url": ""}])
+    assert [item["jan_code"] for item in aggregator.drain_changes()] == ["1", "2"]
+    assert aggregator.drain_changes() == []
+
+    await aggregator.add(
+        Store.RAKUTEN, [{"jan_code": "1", "product_name": "R1", "price": 90, "url": "", "image_url": ""}]
+    )
+    changes = aggregator.drain_changes()
+    assert len(changes) == 1
+    assert changes[0]["product_name"] == {"yahoo": "Y1", "rakuten": "R1", "ebay": None}
+
+
+@pytest.mark.asyncio
+async def test_aggregator_count_offered() -> None:
+    option = {"search_type": SearchType.JAN_CODE}
+    aggregator = formatter.ProductAggregator(option)
+
+    await aggregator.add(
+        Store.YAHOO, [{"jan_code": "1", "product_name": "Y1", "price": 100, "url": "", "image_url": ""}]
+    )
+    await aggregator.add(
+        Store.YAHOO, [{"jan_code": "2", "product_name": "Y2", "price": 100, "url": "", "image_url": ""}], 1
+    )
+    await aggregator.add(
+        Store.RAKUTEN, [{"jan_code": "1", "product_name": "R1", "price": 90, "url": "", "image_url": ""}]
+    )
+
+    assert aggregator.count_offered() == 2
+    assert aggregator.count_offered(2) == 1
+    assert aggregator.count_offered(3) == 0
@@ -0,0 +1,148 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+from app.models.enums import Store
+from app.services import http_request
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.rate_limiter import TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_get_client_is_shared_per_store() -> None:
+    yahoo_client = http_request.get_client(Store.YAHOO)
+
+    assert http_request.get_client(Store.YAHOO) is yahoo_client
+    assert http_request.get_client(Store.RAKUTEN) is not yahoo_client
+
+    await http_request.close_clients()
+
+    assert yahoo_client.is_closed
+    assert http_request.get_client(Store.YAHOO) is not yahoo_client
+    await http_request.close_clients()
+
+
+@pytest.mark.asyncio
+async def test_get_requests_returns_json() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.params["q"] == "mock_keyword"
+        assert request.headers["Authorization"] == "Bearer dummy_token"
+        return httpx.Response(200, json={"hits": [1, 2]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with patch("app.services.http_request.get_client", return_value=client):
+        data = await http_request.get_requests(
+            "https://example.com/search",
+            {"Authorization": "Bearer dummy_token"},
+            {"q": "mock_keyword"},
+            store=Store.EBAY,
+        )
+
+    assert data == {"hits": [1, 2]}
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_requests_raise_exception() -> None:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(500)))
+    with patch("app.services.http_request.get_client", return_value=client):
+        with pytest.raises(httpx.HTTPStatusError):
+            await http_request.get_requests("https://example.com/search", store=Store.YAHOO)
+
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_requests_slow_down_on_429() -> None:
+    bucket = TokenBucket(rate=10.0, burst=1)
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(429, headers={"Retry-After": "0"}))
+    )
+    with patch("app.services.http_request.get_client", return_value=client), patch(
+        "app.services.http_request.get_rate_limiter", return_value=bucket
+    ):
+        with pytest.raises(httpx.HTTPStatusError):
+            await http_request.get_requests("https://example.com/search", store=Store.RAKUTEN)
+
+    assert bucket.rate == 5.0
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_requests_coalesces_identical_requests() -> None:
+    requests: list[httpx.Request] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"q": request.url.params["q"]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with patch("app.services.http_request.get_client", return_value=client):
+        results = await asyncio.gather(
+            http_request.get_requests("https://example.com/search", params={"q": "a", "n": 1}, store=Store.RAKUTEN),
+            http_request.get_requests("https://example.com/search", params={"n": 1, "q": "a"}, store=Store.RAKUTEN),
+            http_request.get_requests("https://example.com/search", params={"q": "b", "n": 1}, store=Store.RAKUTEN),
+        )
+
+    assert results == [{"q": "a"}, {"q": "a"}, {"q": "b"}]
+    assert len(requests) == 2
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_requests_fail_fast_while_circuit_open() -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(503)
+
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=2, open_seconds=60)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with patch("app.services.http_request.get_client", return_value=client), patch(
+        "app.services.http_request.get_circuit_breaker", return_value=breaker
+    ):
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                await http_request.get_requests("https://example.com/search", store=Store.YAHOO)
+        with pytest.raises(http_request.CircuitOpenError):
+            await http_request.get_requests("https://example.com/search", store=Store.YAHOO)
+
+    assert len(requests) == 2
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_requests_not_sent_after_all_callers_cancelled() -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={})
+
+    bucket = TokenBucket(rate=20.0, burst=1)
+    # トークンを使い切り、リクエストをレート制限で待たせる
+    await bucket.acquire()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with patch("app.services.http_request.get_client", return_value=client), patch(
+        "app.services.http_request.get_rate_limiter", return_value=bucket
+    ):
+        tasks = [
+            asyncio.create_task(
+                http_request.get_requests("https://example.com/search", params={"q": q}, store=Store.YAHOO)
+            )
+            for q in ["a", "a", "b"]
+        ]
+        await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # トークンが補充されても、待っている呼び出し元がいないリクエストは送られない
+        await asyncio.sleep(0.2)
+
+    assert requests == []
+    assert not http_request.get_flights.calls
+    await client.aclose()
@@ -0,0 +1,20 @@
+from app.services.jan_ranker import rank_jan_codes
+
+
+def test_rank_jan_codes() -> None:
+    items = [
+        {"jan_code": "49012347", "price": 100.0},
+        {"jan_code": "4902370550733", "price": 0.0},
+        {"jan_code": "", "price": 100.0},
+        {"jan_code": "4902370550733", "price": 200.0},
+        {"jan_code": "4901234567894", "price": 300.0},
+        {"jan_code": "4901234567894", "price": 300.0},
+        {"jan_code": "49968712", "price": 100.0},
+    ]
+
+    # ヒット数、価格のある商品数、最初に見つかった順番の順に優先する
+    assert rank_jan_codes(items) == ["4901234567894", "4902370550733", "49012347", "49968712"]
+
+
+def test_rank_jan_codes_empty() -> None:
+    assert rank_jan_codes([{"jan_code": None}]) == []
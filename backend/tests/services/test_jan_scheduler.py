@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from app.models.enums import Store
+from app.services.fan_out import BatchCallback
+from app.services.jan_scheduler import JanLookupScheduler
+
+
+@pytest.mark.asyncio
+async def test_scheduler_batches_and_deduplicates_lookups() -> None:
+    dispatched: list[tuple[Store, list[str], int]] = []
+
+    async def dispatch(store: Store, jan_codes: list[str], limit: int, on_batch: BatchCallback) -> None:
+        dispatched.append((store, jan_codes, limit))
+        for seq, jan_code in enumerate(jan_codes):
+            await on_batch(seq, jan_code, [{"jan_code": jan_code, "store": store.value}])
+
+    scheduler = JanLookupScheduler(dispatch, window=0.01)
+    results = await asyncio.gather(
+        scheduler.lookup(Store.RAKUTEN, "4902370550733", 30),
+        scheduler.lookup(Store.RAKUTEN, "49012347", 30),
+        scheduler.lookup(Store.RAKUTEN, "4902370550733", 30),
+        scheduler.lookup(Store.EBAY, "4902370550733", 30),
+    )
+
+    assert results[0] == results[2] == [{"jan_code": "4902370550733", "store": "rakuten"}]
+    assert results[3] == [{"jan_code": "4902370550733", "store": "ebay"}]
+    assert sorted(dispatched, key=lambda batch: batch[0].value) == [
+        (Store.EBAY, ["4902370550733"], 30),
+        (Store.RAKUTEN, ["4902370550733", "49012347"], 30),
+    ]
+    assert scheduler.stats() == {"requested": 4, "coalesced": 1, "dispatched": 3, "batches": 2}
+
+
+@pytest.mark.asyncio
+async def test_scheduler_returns_none_for_failed_lookups() -> None:
+    async def dispatch(store: Store, jan_codes: list[str], limit: int, on_batch: BatchCallback) -> None:
+        await on_batch(0, jan_codes[0], [])
+        raise RuntimeError("upstream error")
+
+    scheduler = JanLookupScheduler(dispatch, window=0)
+    results = await asyncio.gather(
+        scheduler.lookup(Store.YAHOO, "4902370550733", 30),
+        scheduler.lookup(Store.YAHOO, "49012347", 30),
+    )
+
+    assert results == [[], None]
+    assert scheduler.in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_scheduler_cancels_dispatch_without_waiters() -> None:
+    cancelled = asyncio.Event()
+
+    async def dispatch(store: Store, jan_codes: list[str], limit: int, on_batch: BatchCallback) -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    scheduler = JanLookupScheduler(dispatch, window=0)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(scheduler.lookup(Store.YAHOO, "4902370550733", 30), 0.05)
+
+    await asyncio.wait_for(cancelled.wait(), 1)
+    await asyncio.sleep(0)
+    assert scheduler.in_flight == {}
+    assert scheduler.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_scheduler_starts_new_batch_after_cancel() -> None:
+    dispatched: list[list[str]] = []
+
+    async def dispatch(store: Store, jan_codes: list[str], limit: int, on_batch: BatchCallback) -> None:
+        dispatched.append(jan_codes)
+        if len(dispatched) == 1:
+            await asyncio.sleep(10)
+        await on_batch(0, jan_codes[0], [{"jan_code": jan_codes[0]}])
+
+    scheduler = JanLookupScheduler(dispatch, window=0)
+    cancelled = asyncio.create_task(scheduler.lookup(Store.YAHOO, "4902370550733", 30))
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+
+    # 取り消された検索には合流せず、新しく検索する
+    result = await scheduler.lookup(Store.YAHOO, "4902370550733", 30)
+
+    assert result == [{"jan_code": "4902370550733"}]
+    assert dispatched == [["4902370550733"], ["4902370550733"]]
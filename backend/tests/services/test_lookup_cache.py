@@ -0,0 +1,32 @@
+from unittest.mock import patch
+
+from app.models.enums import Store
+from app.services.lookup_cache import LookupCache
+
+
+def test_lookup_cache_uses_store_ttl() -> None:
+    cache = LookupCache(ttls={Store.YAHOO: 100, Store.RAKUTEN: 10, Store.EBAY: 0}, negative_ttl=5)
+    items = [{"jan_code": "4901234567894"}]
+    with patch("app.services.cache.time.monotonic", return_value=0.0):
+        for store in Store:
+            cache.set(store, ("4901234567894", 30), items)
+
+    with patch("app.services.cache.time.monotonic", return_value=50.0):
+        assert cache.get(Store.YAHOO, ("4901234567894", 30)) == items
+        assert cache.get(Store.RAKUTEN, ("4901234567894", 30)) is None
+        # TTLが0のストアはキャッシュしない
+        assert cache.get(Store.EBAY, ("4901234567894", 30)) is None
+        assert cache.get(Store.YAHOO, ("4901234567894", 10)) is None
+
+
+def test_lookup_cache_keeps_empty_results_shorter() -> None:
+    cache = LookupCache(ttls={Store.YAHOO: 100}, negative_ttl=5)
+    with patch("app.services.cache.time.monotonic", return_value=0.0):
+        cache.set(Store.YAHOO, ("4901234567894", 30), [])
+
+    with patch("app.services.cache.time.monotonic", return_value=3.0):
+        assert cache.get(Store.YAHOO, ("4901234567894", 30)) == []
+    with patch("app.services.cache.time.monotonic", return_value=10.0):
+        assert cache.get(Store.YAHOO, ("4901234567894", 30)) is None
+
+    assert cache.stats()["yahoo"]["entries"] == 0
@@ -0,0 +1,45 @@
+import difflib
+import random
+
+from app.services.name_index import NameIndex
+
+
+def test_candidates_in_added_order() -> None:
+    index = NameIndex()
+    index.add("1", "商品a 1")
+    index.add("2", "テスト")
+    index.add("3", "商品a 2")
+
+    assert index.candidates(["商品a 2"], 0.5) == ["1", "3"]
+    assert index.candidates(["other"], 0.5) == []
+    assert index.candidates(["other"], 0.0) == ["1", "2", "3"]
+
+
+def test_add_replaces_name_and_keeps_order() -> None:
+    index = NameIndex()
+    index.add("1", "apple")
+    index.add("2", "orange")
+    index.add("1", "orange juice")
+
+    assert index.candidates(["apple"], 0.5) == []
+    assert index.candidates(["orange"], 0.5) == ["1", "2"]
+
+
+def test_candidates_never_miss_similar_names() -> None:
+    rng = random.Random(0)
+    alphabet = "abcde 商品テスト"
+    names = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))) for _ in range(200)]
+
+    index = NameIndex()
+    for i, name in enumerate(names):
+        index.add(str(i), name)
+
+    for query in names[:50]:
+        for threshold in (0.3, 0.45, 0.8):
+            expected = [
+                str(i)
+                for i, name in enumerate(names)
+                if difflib.SequenceMatcher(None, name, query).ratio() >= threshold
+            ]
+            candidates = index.candidates([query], threshold)
+            assert set(expected) <= set(candidates)
@@ -0,0 +1,71 @@
+import pytest
+from app.services.pagination import fetch_pages, split_pages
+
+
+def test_split_pages() -> None:
+    assert split_pages(30, 30) == [(0, 30)]
+    assert split_pages(99, 30) == [(0, 30), (30, 30), (60, 30), (90, 9)]
+    assert split_pages(10, 100) == [(0, 10)]
+
+
+@pytest.mark.asyncio
+async def test_fetch_pages_merges_and_skips_failed_pages() -> None:
+    async def fetch(offset: int, size: int) -> tuple[list[dict], int | None] | None:
+        if offset == 2:
+            return None
+        return [{"url": f"https://example.com/{offset + i}"} for i in range(size)] + [{"url": ""}], None
+
+    items = await fetch_pages(6, 2, fetch)
+
+    assert items is not None
+    assert [item["url"] for item in items] == [
+        "https://example.com/0",
+        "https://example.com/1",
+        "",
+        "https://example.com/4",
+        "https://example.com/5",
+        "",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fetch_pages_stops_at_short_first_page() -> None:
+    requested: list[tuple[int, int]] = []
+
+    async def fetch(offset: int, size: int) -> tuple[list[dict], int | None] | None:
+        requested.append((offset, size))
+        return [{"url": "https://example.com/0"}], None
+
+    items = await fetch_pages(90, 30, fetch)
+
+    # 1ページ目が要求した件数に満たないため、次のページは要求しない
+    assert requested == [(0, 30)]
+    assert items == [{"url": "https://example.com/0"}]
+
+
+@pytest.mark.asyncio
+async def test_fetch_pages_requests_only_existing_pages() -> None:
+    requested: list[tuple[int, int]] = []
+
+    async def fetch(offset: int, size: int) -> tuple[list[dict], int | None] | None:
+        requested.append((offset, size))
+        return [{"url": f"https://example.com/{offset + i}"} for i in range(size)], 45
+
+    items = await fetch_pages(90, 30, fetch)
+
+    assert requested == [(0, 30), (30, 15)]
+    assert items is not None
+    assert len(items) == 45
+
+
+@pytest.mark.asyncio
+async def test_fetch_pages_all_failed() -> None:
+    requested: list[tuple[int, int]] = []
+
+    async def fetch(offset: int, size: int) -> tuple[list[dict], int | None] | None:
+        requested.append((offset, size))
+        return None
+
+    assert await fetch_pages(60, 30, fetch) is None
+    # 1ページ目が失敗した場合は残りのページを要求しない
+    assert requested == [(0, 30)]
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+from app.models.enums import Store
+from app.services import rate_limiter
+from app.services.rate_limiter import TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_acquire_burst_without_wait() -> None:
+    bucket = TokenBucket(rate=1.0, burst=3)
+
+    started = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+
+    assert time.monotonic() - started < 0.1
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_refill() -> None:
+    bucket = TokenBucket(rate=20.0, burst=1)
+
+    started = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+
+    # 1件目は即時、残り2件は0.05秒ずつ待つ
+    assert time.monotonic() - started >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_slow_down_and_speed_up() -> None:
+    bucket = TokenBucket(rate=10.0, burst=1)
+
+    bucket.slow_down()
+    assert bucket.rate == 5.0
+    assert bucket.tokens == 0.0
+
+    for _ in range(10):
+        bucket.speed_up()
+    assert bucket.rate == 10.0
+
+
+@pytest.mark.asyncio
+async def test_slow_down_with_retry_after_blocks() -> None:
+    bucket = TokenBucket(rate=100.0, burst=1)
+    bucket.slow_down(0.1)
+
+    started = time.monotonic()
+    await bucket.acquire()
+
+    assert time.monotonic() - started >= 0.09
+
+
+def test_get_rate_limiter() -> None:
+    assert rate_limiter.get_rate_limiter(Store.RAKUTEN) is rate_limiter.get_rate_limiter(Store.RAKUTEN)
+    assert rate_limiter.get_rate_limiter(Store.EBAY) is None
+
+
+def test_parse_retry_after() -> None:
+    assert rate_limiter.parse_retry_after("3") == 3.0
+    assert rate_limiter.parse_retry_after(None) is None
+    assert rate_limiter.parse_retry_after("invalid") is None
+    assert rate_limiter.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
@@ -0,0 +1,19 @@
+import pathlib
+
+from app.services import save
+
+
+def test_append_to_jsonl_and_resume(tmp_path: pathlib.Path) -> None:
+    path = str(tmp_path / "output.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        # 中断により書きかけになった行
+        f.write('{"keyword": "商品A", "items": []}\n{"keyword": "商品B", "it')
+
+    with save.open_jsonl(path) as f:
+        save.append_to_jsonl({"keyword": "商品C", "items": [{"jan_code": "4902370550733"}]}, f)
+
+    assert save.load_jsonl_values(path, "keyword") == {"商品A", "商品C"}
+
+
+def test_load_jsonl_values_missing_file(tmp_path: pathlib.Path) -> None:
+    assert save.load_jsonl_values(str(tmp_path / "missing.jsonl"), "keyword") == set()
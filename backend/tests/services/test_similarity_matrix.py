@@ -0,0 +1,35 @@
+from app.services.similarity_matrix import match_names
+
+
+def test_match_names_existing_groups() -> None:
+    assignments = match_names(
+        ["商品a 2", "other"],
+        ["商品a 2", "other"],
+        ["テスト", "商品a 1"],
+        0.45,
+    )
+
+    # 既存グループ(1)に追加、該当なしは自身が新規グループ(2 + 1)
+    assert assignments == [1, 3]
+
+
+def test_match_names_groups_created_in_batch() -> None:
+    assignments = match_names(
+        ["product a 1", "product a 2", "other"],
+        ["product a 1", "商品a 2", "other"],
+        [],
+        0.45,
+    )
+
+    assert assignments == [0, 0, 2]
+
+
+def test_match_names_uses_translated_name() -> None:
+    assignments = match_names(["product a"], ["商品a"], ["商品a"], 0.9)
+
+    assert assignments == [0]
+
+
+def test_match_names_empty() -> None:
+    assert match_names([], [], ["商品a"], 0.45) == []
+    assert match_names(["", ""], ["", ""], [""], 0.45) == [1, 2]
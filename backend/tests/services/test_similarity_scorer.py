@@ -0,0 +1,39 @@
+import difflib
+import random
+
+from app.services.similarity_scorer import PruningStats, SimilarityScorer
+
+
+def test_is_similar_identical_to_ratio() -> None:
+    rng = random.Random(0)
+    alphabet = "abc 商品テ"
+    texts = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 15))) for _ in range(60)]
+
+    for threshold in (0.0, 0.3, 0.45, 0.9):
+        scorer = SimilarityScorer(threshold)
+        for text in texts:
+            matcher = scorer.matcher(text)
+            for org_text in texts:
+                expected = difflib.SequenceMatcher(None, org_text, text).ratio() >= threshold
+                assert scorer.is_similar(org_text, matcher) == expected
+
+
+def test_pruning_stats() -> None:
+    stats = PruningStats()
+    scorer = SimilarityScorer(0.5, stats)
+
+    assert scorer.is_similar("a", scorer.matcher("abcdefghij")) is False
+    assert scorer.is_similar("abcd", scorer.matcher("wxyz")) is False
+    assert scorer.is_similar("abcd", scorer.matcher("abce")) is True
+
+    assert stats.to_dict() == {
+        "compared": 3,
+        "real_quick_pruned": 1,
+        "quick_pruned": 1,
+        "full_ratio": 1,
+        "pruning_rate": 2 / 3,
+    }
+
+    stats.reset()
+    assert stats.compared == 0
+    assert stats.pruning_rate() == 0.0
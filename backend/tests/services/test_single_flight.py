@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from app.services.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls() -> None:
+    flights = SingleFlight()
+    calls = 0
+
+    async def call() -> dict:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"hits": calls}
+
+    results = await asyncio.gather(*(flights.do("key", call) for _ in range(5)))
+
+    assert results == [{"hits": 1}] * 5
+    assert flights.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+    # 完了後の呼び出しは改めて実行する
+    assert await flights.do("key", call) == {"hits": 2}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_exception() -> None:
+    flights = SingleFlight()
+
+    async def call() -> None:
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    results = await asyncio.gather(flights.do("key", call), flights.do("key", call), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_caller_cancel() -> None:
+    flights = SingleFlight()
+
+    async def call() -> str:
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.create_task(flights.do("key", call))
+    second = asyncio.create_task(flights.do("key", call))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "done"
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_call_without_callers() -> None:
+    flights = SingleFlight()
+    started: list[int] = []
+    cancelled: list[int] = []
+
+    async def call() -> str:
+        started.append(len(started))
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(started[-1])
+            raise
+        return "done"
+
+    callers = [asyncio.create_task(flights.do("key", call)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+
+    # 取り消された呼び出しには合流せず、新しく実行する
+    retry = asyncio.create_task(flights.do("key", call))
+    await asyncio.sleep(0.01)
+
+    assert started == [0, 1]
+    assert cancelled == [0]
+    retry.cancel()
+    await asyncio.gather(retry, return_exceptions=True)
+    assert flights.stats()["in_flight"] == 0
@@ -0,0 +1,54 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from app.services.token_manager import TokenManager
+
+
+@pytest.mark.asyncio
+async def test_get_caches_token() -> None:
+    fetch = AsyncMock(return_value=("token-1", 7200.0))
+    manager = TokenManager(fetch)
+
+    assert await manager.get() == "token-1"
+    assert await manager.get() == "token-1"
+    assert fetch.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_shares_single_refresh() -> None:
+    async def fetch() -> tuple[str, float]:
+        await asyncio.sleep(0.01)
+        return "token-1", 7200.0
+
+    mock_fetch = AsyncMock(side_effect=fetch)
+    manager = TokenManager(mock_fetch)
+
+    tokens = await asyncio.gather(*[manager.get() for _ in range(10)])
+
+    assert tokens == ["token-1"] * 10
+    assert mock_fetch.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_refreshes_in_background_before_expiry() -> None:
+    fetch = AsyncMock(side_effect=[("token-1", 100.0), ("token-2", 7200.0)])
+    manager = TokenManager(fetch, refresh_margin=300.0)
+
+    assert await manager.get() == "token-1"
+    # 期限切れ前なので古いトークンを返しつつ更新する
+    assert await manager.get() == "token-1"
+    assert manager.refresh_task is not None
+    await manager.refresh_task
+
+    assert await manager.get() == "token-2"
+    assert fetch.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_returns_empty_on_failure() -> None:
+    fetch = AsyncMock(side_effect=[("", 0.0), Exception("error")])
+    manager = TokenManager(fetch)
+
+    assert await manager.get() == ""
+    assert await manager.get() == ""
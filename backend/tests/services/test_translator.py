@@ -1,8 +1,16 @@
-from unittest.mock import AsyncMock, patch
+import asyncio
+import pathlib
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
 from app.services import translator
+from app.services.translation_cache import TranslationCache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> None:
+    translator.cache.clear()
 
 
 @pytest.mark.asyncio
@@ -30,3 +38,95 @@ async def test_translate_japanese_input(mock_translate: AsyncMock, mock_detect:
 
     assert result == {"en": "hello", "ja": "こんにちは"}
     mock_translate.assert_called_once_with("こんにちは", dest="en")
+
+
+@pytest.mark.asyncio
+@patch("app.services.translator.__translator.detect", new_callable=AsyncMock)
+@patch("app.services.translator.__translator.translate", new_callable=AsyncMock)
+async def test_translate_uses_cache(mock_translate: AsyncMock, mock_detect: AsyncMock) -> None:
+    mock_detect.return_value.lang = "en"
+    mock_translate.return_value.text = "こんにちは"
+
+    await translator.translate("hello")
+    result = await translator.translate("hello")
+
+    assert result == {"en": "hello", "ja": "こんにちは"}
+    mock_detect.assert_not_called()
+    mock_translate.assert_called_once_with("hello", dest="ja")
+    assert translator.cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_translation_cache_persists(tmp_path: pathlib.Path) -> None:
+    path = str(tmp_path / "translation.sqlite3")
+    cache = TranslationCache(path)
+    assert await cache.get("hello", "ja") is None
+    await cache.set("hello", "ja", "こんにちは")
+
+    # 再起動後もディスクから取得できる
+    restarted = TranslationCache(path)
+    assert await restarted.get("hello", "ja") == "こんにちは"
+    assert await restarted.get("hello", "ja") == "こんにちは"
+    assert restarted.stats() == {"hits": 1, "disk_hits": 1, "misses": 0, "size": 1}
+
+
+@pytest.mark.asyncio
+async def test_translation_cache_evicts_least_recently_used() -> None:
+    cache = TranslationCache(maxsize=2)
+    await cache.set("a", "ja", "A")
+    await cache.set("b", "ja", "B")
+    await cache.get("a", "ja")
+    await cache.set("c", "ja", "C")
+
+    assert await cache.get("b", "ja") is None
+    assert await cache.get("a", "ja") == "A"
+    assert await cache.get("c", "ja") == "C"
+
+
+@pytest.mark.asyncio
+@patch("app.services.translator.__translator.translate", new_callable=AsyncMock)
+async def test_translate_all_to_japanese(mock_translate: AsyncMock) -> None:
+    mock_translate.side_effect = lambda text, dest: Mock(text=f"{text}_ja")
+
+    result = await translator.translate_all_to_japanese(["apple", "orange", "apple"])
+
+    assert result == {"apple": "apple_ja", "orange": "orange_ja"}
+    assert mock_translate.call_count == 2
+
+
+def test_detect_language() -> None:
+    assert translator.detect_language("hello world") == "en"
+    assert translator.detect_language("iPhone 15 Pro") == "en"
+    assert translator.detect_language("こんにちは") == "ja"
+    assert translator.detect_language("カメラ") == "ja"
+    assert translator.detect_language("ｶﾒﾗ") == "ja"
+    assert translator.detect_language("東京") == "ja"
+    assert translator.detect_language("ＰＳ５") == "ja"
+    assert translator.detect_language("Nintendo スイッチ") == "ja"
+    assert translator.detect_language("12345") is None
+    assert translator.detect_language("café") is None
+
+
+@pytest.mark.asyncio
+@patch("app.services.translator.__translator.detect", new_callable=AsyncMock)
+async def test_is_english_falls_back_to_remote(mock_detect: AsyncMock) -> None:
+    mock_detect.return_value.lang = "fr"
+
+    assert await translator.is_english("hello") is True
+    assert await translator.is_english("café") is False
+    mock_detect.assert_called_once_with("café")
+
+
+@pytest.mark.asyncio
+@patch("app.services.translator.__translator.translate", new_callable=AsyncMock)
+async def test_lazy_translation_translates_on_demand(mock_translate: AsyncMock) -> None:
+    mock_translate.return_value.text = "こんにちは"
+
+    translation = translator.LazyTranslation("hello")
+    assert await translation.en() == "hello"
+    mock_translate.assert_not_called()
+
+    results = await asyncio.gather(translation.ja(), translation.ja())
+
+    assert results == ["こんにちは", "こんにちは"]
+    mock_translate.assert_called_once_with("hello", dest="ja")
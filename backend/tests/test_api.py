@@ -0,0 +1,297 @@
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Optional
+from unittest.mock import patch
+
+import httpx
+import pytest
+import pytest_asyncio
+from app import api
+from app.services.cache import StaleWhileRevalidateCache, TTLCache
+from app.services.circuit_breaker import CircuitBreaker
+from app.models.enums import SearchType, SimilarityEngine, Store, TranslateKeyword
+from app.services.fan_out import BatchCallback
+from app.services.formatter import ProductAggregator
+from app.services.lookup_cache import LookupCache
+from app.services.translator import LazyTranslation
+
+JAN_CODE = "4902370550733"
+
+
+def fake_search(store: str, calls: Optional[list[list[str]]] = None, delay: float = 0.0, error: bool = False) -> Any:
+    """
+    Create a store search that returns one item per keyword.
+    """
+
+    async def search(
+        keywords: list[str], option: dict[str, Any], on_batch: Optional[BatchCallback] = None
+    ) -> list[dict[str, Any]]:
+        if calls is not None:
+            calls.append(list(keywords))
+        await asyncio.sleep(delay)
+        if error:
+            raise RuntimeError("upstream error")
+
+        items: list[dict[str, Any]] = []
+        for seq, keyword in enumerate(keywords):
+            batch = [
+                {
+                    "jan_code": keyword,
+                    "product_name": f"{store}-{keyword}",
+                    "price": 100.0,
+                    "url": f"https://{store}.example.com/{keyword}",
+                    "image_url": "",
+                }
+            ]
+            if on_batch is not None:
+                await on_batch(seq, keyword, batch)
+            items.extend(batch)
+        return items
+
+    return search
+
+
+def patch_stores(yahoo: Any = None, rakuten: Any = None, ebay: Any = None) -> Any:
+    return (
+        patch("app.api.search_yahoo_items_by_jan_code", yahoo or fake_search("yahoo")),
+        patch("app.api.search_rakuten_items", rakuten or fake_search("rakuten")),
+        patch("app.api.search_ebay_items", ebay or fake_search("ebay")),
+    )
+
+
+@pytest_asyncio.fixture
+async def client() -> AsyncIterator[httpx.AsyncClient]:
+    # テストごとにキャッシュを空にする
+    with patch("app.api.response_cache", StaleWhileRevalidateCache(TTLCache(ttl=300))), patch(
+        "app.api.lookup_cache", LookupCache()
+    ):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+
+def hanging_search(cancelled: asyncio.Event) -> Any:
+    """
+    Create a store search that never finishes, and sets the event when it is cancelled.
+    """
+
+    async def search(
+        keywords: list[str], option: dict[str, Any], on_batch: Optional[BatchCallback] = None
+    ) -> list[dict[str, Any]]:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return []
+
+    return search
+
+
+def read_events(response: httpx.Response) -> list[dict[str, Any]]:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.mark.asyncio
+async def test_search_stream(client: httpx.AsyncClient) -> None:
+    yahoo, rakuten, ebay = patch_stores()
+    with yahoo, rakuten, ebay:
+        response = await client.get("/search/stream", params={"keyword": JAN_CODE})
+
+    events = read_events(response)
+    assert response.status_code == 200
+    assert sorted(event["store"] for event in events if event["event"] == "store_completed") == [
+        "ebay",
+        "rakuten",
+        "yahoo",
+    ]
+    items = [item for event in events if event["event"] == "items" for item in event["items"]]
+    assert items[-1]["jan_code"] == JAN_CODE
+    assert events[-1] == {
+        "event": "summary",
+        "count": 1,
+        "stores": {"yahoo": 1, "rakuten": 1, "ebay": 1},
+        "incomplete": [],
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("search_type", ["0", "1"])
+async def test_search_stream_reports_failed_store(client: httpx.AsyncClient, search_type: str) -> None:
+    async def translate(texts: list[str]) -> dict[str, str]:
+        return {text: text for text in texts}
+
+    yahoo, rakuten, ebay = patch_stores(rakuten=fake_search("rakuten", error=True))
+    with yahoo, rakuten, ebay, patch("app.services.formatter.translate_all_to_japanese", translate):
+        response = await client.get(
+            "/search/stream", params={"keyword": JAN_CODE, "search_type": search_type, "translate_keyword": "0"}
+        )
+
+    events = read_events(response)
+    assert {"event": "store_incomplete", "store": "rakuten", "reason": "error", "count": 0} in events
+    assert events[-1]["incomplete"] == ["rakuten"]
+    assert events[-1]["stores"] == {"yahoo": 1, "rakuten": 0, "ebay": 1}
+
+
+@pytest.mark.asyncio
+async def test_search_reports_failed_store_without_caching(client: httpx.AsyncClient) -> None:
+    yahoo, rakuten, ebay = patch_stores(ebay=fake_search("ebay", error=True))
+    with yahoo, rakuten, ebay:
+        response = await client.get("/search", params={"keyword": JAN_CODE})
+
+    assert response.status_code == 200
+    assert response.headers["X-Incomplete-Stores"] == "ebay"
+    price = response.json()[0]["price"]
+    assert price["yahoo"]["min"] == price["rakuten"]["min"] == 100.0
+    assert price["ebay"]["min"] is None
+    assert api.response_cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_search_batch(client: httpx.AsyncClient) -> None:
+    calls: dict[str, list[list[str]]] = {"yahoo": [], "rakuten": [], "ebay": []}
+    yahoo, rakuten, ebay = patch_stores(
+        *[fake_search(store, calls[store], delay=0.01) for store in ["yahoo", "rakuten", "ebay"]]
+    )
+    keywords = [JAN_CODE, "", f" {JAN_CODE} ", f"{JAN_CODE},49012347"]
+    with yahoo, rakuten, ebay, patch("app.api.run_search", wraps=api.run_search) as run_search:
+        response = await client.post("/search/batch", json={"keywords": keywords})
+
+    events = read_events(response)
+    assert response.status_code == 200
+    # 空のキーワードはすぐにエラーとして返し、集計は最後に返す
+    assert events[0] == {"event": "error", "index": 1, "keyword": "", "detail": "keyword is required."}
+    assert events[-1] == {"event": "summary", "count": 4, "errors": 1, "lookups": 6}
+
+    results = {event["index"]: event for event in events if event["event"] == "result"}
+    assert sorted(results) == [0, 2, 3]
+    assert results[0]["items"] == results[2]["items"]
+    assert [item["jan_code"] for item in results[3]["items"]] == [JAN_CODE, "49012347"]
+    assert all(result["incomplete"] == [] for result in results.values())
+
+    # 同じキーワードは一度だけ検索し、JANコードはバッチ全体で各ストア一度だけ検索する
+    assert run_search.call_count == 2
+    for store_calls in calls.values():
+        codes = [code for call in store_calls for code in call]
+        assert sorted(codes) == sorted([JAN_CODE, "49012347"])
+
+
+@pytest.mark.asyncio
+async def test_search_batch_reports_failed_search(client: httpx.AsyncClient) -> None:
+    yahoo, rakuten, ebay = patch_stores()
+    with yahoo, rakuten, ebay, patch("app.api.run_search", side_effect=RuntimeError("error")):
+        response = await client.post("/search/batch", json={"keywords": [JAN_CODE]})
+
+    events = read_events(response)
+    assert events == [
+        {"event": "error", "index": 0, "keyword": JAN_CODE, "detail": "An error occurred inside the server."},
+        {"event": "summary", "count": 1, "errors": 1, "lookups": 0},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_returns_partial_results_at_deadline(client: httpx.AsyncClient) -> None:
+    cancelled = asyncio.Event()
+    yahoo, rakuten, ebay = patch_stores(ebay=hanging_search(cancelled))
+    started = time.monotonic()
+    with yahoo, rakuten, ebay:
+        response = await client.get("/search", params={"keyword": JAN_CODE, "deadline_ms": 200})
+
+    assert time.monotonic() - started < 2
+    assert response.status_code == 200
+    assert response.headers["X-Incomplete-Stores"] == "ebay"
+    price = response.json()[0]["price"]
+    assert price["yahoo"]["min"] == price["rakuten"]["min"] == 100.0
+    assert price["ebay"]["min"] is None
+    # 取り消された検索は上流まで止まり、途中の結果はキャッシュしない
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert api.response_cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_search_stream_reports_stores_past_deadline(client: httpx.AsyncClient) -> None:
+    yahoo, rakuten, ebay = patch_stores(ebay=hanging_search(asyncio.Event()))
+    with yahoo, rakuten, ebay:
+        response = await client.get("/search/stream", params={"keyword": JAN_CODE, "deadline_ms": 200})
+
+    events = read_events(response)
+    assert {"event": "store_incomplete", "store": "ebay", "reason": "deadline"} in events
+    assert events[-1] == {
+        "event": "summary",
+        "count": 1,
+        "stores": {"yahoo": 1, "rakuten": 1},
+        "incomplete": ["ebay"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_search_batch_reports_stores_past_deadline(client: httpx.AsyncClient) -> None:
+    yahoo, rakuten, ebay = patch_stores(rakuten=hanging_search(asyncio.Event()))
+    with yahoo, rakuten, ebay:
+        response = await client.post("/search/batch", json={"keywords": [JAN_CODE], "deadline_ms": 200})
+
+    events = read_events(response)
+    assert events[0]["event"] == "result"
+    assert events[0]["incomplete"] == ["rakuten"]
+    assert api.response_cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_search_stores_reads_results_finished_before_deadline() -> None:
+    option: dict[str, Any] = api.with_deadline(
+        {
+            "search_type": SearchType.JAN_CODE,
+            "translate_keyword": TranslateKeyword.TRANSLATE,
+            "search_result_limit": 30,
+            "similarity_threshold": 0.45,
+            "similarity_engine": SimilarityEngine.DIFFLIB,
+            "deadline_ms": 100,
+        }
+    )
+    keyword_map = api.get_keyword_map(JAN_CODE, LazyTranslation(JAN_CODE), [JAN_CODE])
+
+    events: list[dict[str, Any]] = []
+    yahoo, rakuten, ebay = patch_stores()
+    with yahoo, rakuten, ebay, patch("app.api.lookup_cache", LookupCache()):
+        async for event in api.search_stores(keyword_map, option, ProductAggregator(option)):
+            events.append(event)
+            if len(events) == 1:
+                # 呼び出し元の処理が遅れ、制限時間を過ぎてから残りの結果を読み取る
+                await asyncio.sleep(0.2)
+
+    assert sorted(event["store"] for event in events if event["event"] == "store_completed") == [
+        "ebay",
+        "rakuten",
+        "yahoo",
+    ]
+    assert not [event for event in events if event["event"] == "store_incomplete"]
+
+
+@pytest.mark.asyncio
+async def test_search_skips_store_with_open_circuit(client: httpx.AsyncClient) -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, min_requests=1, open_seconds=60)
+    generation = breaker.allow()
+    assert generation is not None
+    breaker.record(generation, True)
+    ebay_calls: list[list[str]] = []
+    cached = {"jan_code": JAN_CODE, "product_name": "cached", "price": 50.0, "url": "https://ebay.example.com/cached"}
+    api.lookup_cache.set(Store.EBAY, (JAN_CODE, 30), [cached])
+
+    yahoo, rakuten, ebay = patch_stores(ebay=fake_search("ebay", ebay_calls))
+    with yahoo, rakuten, ebay, patch(
+        "app.api.get_circuit_breaker", side_effect=lambda store: breaker if store == Store.EBAY else None
+    ):
+        response = await client.get("/search", params={"keyword": f"{JAN_CODE} 49012347"})
+        stream = await client.get("/search/stream", params={"keyword": "49012347"})
+
+    # 障害中のストアは検索せず、キャッシュ済みの結果だけを返す
+    assert ebay_calls == []
+    assert response.headers["X-Incomplete-Stores"] == "ebay"
+    prices = {item["jan_code"]: item["price"]["ebay"]["min"] for item in response.json()}
+    assert prices == {JAN_CODE: 50.0, "49012347": None}
+    assert api.response_cache.stats()["entries"] == 0
+
+    events = read_events(stream)
+    assert {"event": "store_incomplete", "store": "ebay", "reason": "circuit_open", "count": 0} in events
+    assert events[-1]["incomplete"] == ["ebay"]
@@ -0,0 +1,73 @@
+import json
+import pathlib
+from typing import Any, Optional
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from app import main
+from app.models.enums import Store
+
+
+async def fake_run_search(
+    keyword: str, option: dict[str, Any], incomplete: Optional[set[Store]] = None
+) -> list[dict[str, Any]]:
+    if keyword == "error":
+        raise RuntimeError("search failed")
+    if keyword == "partial" and incomplete is not None:
+        incomplete.add(Store.EBAY)
+    return [{"jan_code": keyword}]
+
+
+@pytest.mark.asyncio
+async def test_search_bulk_resumes(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "output.jsonl"
+    # "A"は検索済み、"B"は書き込み中に中断された行
+    path.write_text('{"keyword": "A", "items": []}\n{"keyword": "B", "it', encoding="utf-8")
+
+    run_search = AsyncMock(side_effect=fake_run_search)
+    with patch("app.main.run_search", run_search), patch(
+        "app.main.get_output_path", return_value=str(path)
+    ), patch("app.main.close_clients", AsyncMock()):
+        await main.search_bulk(iter(["A", "B", "error", "partial", "C", "B"]), "output.jsonl", 2)
+
+    # 検索済みのキーワードと重複したキーワードは検索しない
+    assert sorted(call.args[0] for call in run_search.await_args_list) == ["B", "C", "error", "partial"]
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[:2] == ['{"keyword": "A", "items": []}', '{"keyword": "B", "it']
+    # 書きかけの行の後ろから追記し、失敗したキーワードと一部のストアの結果が欠けたキーワードは書き込まない
+    records = [json.loads(line) for line in lines[2:]]
+    assert sorted(record["keyword"] for record in records) == ["B", "C"]
+    assert {"keyword": "C", "items": [{"jan_code": "C"}]} in records
+
+
+@pytest.mark.asyncio
+async def test_search_bulk_without_resume(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "output.jsonl"
+    path.write_text('{"keyword": "A", "items": []}\n', encoding="utf-8")
+
+    run_search = AsyncMock(side_effect=fake_run_search)
+    with patch("app.main.run_search", run_search), patch(
+        "app.main.get_output_path", return_value=str(path)
+    ), patch("app.main.close_clients", AsyncMock()):
+        await main.search_bulk(iter(["A"]), "output.jsonl", 1, resume=False)
+
+    assert run_search.await_count == 1
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_read_keywords(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / "keywords.txt"
+    path.write_text("nintendo switch\n\n  4902370550733  \n", encoding="utf-8")
+
+    assert list(main.read_keywords(str(path))) == ["nintendo switch", "4902370550733"]
+
+
+def test_parse_args() -> None:
+    args = main.parse_args(["-i", "-", "-c", "8", "--no-resume"])
+
+    assert args.keyword is None
+    assert args.input == "-"
+    assert args.output == "output.jsonl"
+    assert args.concurrency == 8
+    assert args.no_resume